@@ -0,0 +1,119 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from typing import List
+from urllib.parse import urlparse
+from lineal_rugby import crawler
+from lineal_rugby.models import Feed
+from .fake_sportradar import FakeSportradar
+from .pipeline import in_temp_dir
+
+
+def _crawl(fake: FakeSportradar, feeds: List[Feed], max_workers: int) -> dict:
+    before = Counter(fake.statuses)
+    start = time.perf_counter()
+    results = crawler.crawl_feeds(feeds, max_workers)
+    seconds = time.perf_counter() - start
+
+    statuses = fake.statuses - before
+    requests = sum(statuses.values())
+    reports = [report for _, report in results.values()]
+    fetched = sum(report.fetched for report in reports)
+    resumed = sum(report.resumed for report in reports)
+    return {
+        "seconds": round(seconds, 3),
+        "requests": requests,
+        "requests_per_second": round(requests / seconds, 1) if seconds else None,
+        # seasons served from a checkpoint instead of the api
+        "cache_hit_ratio": (
+            round(resumed / (fetched + resumed), 3) if fetched + resumed else None
+        ),
+        "failed_seasons": sum(len(report.failed) for report in reports),
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def run(
+    fake: FakeSportradar,
+    interval: float = 0.0,
+    max_workers: int = crawler.MAX_WORKERS,
+) -> dict:
+    """Crawl the sevens and union feeds from the fake api twice, cold and then resuming from the checkpoints.
+
+    Args:
+        fake (FakeSportradar): a started server, its fault settings are the scenario
+        interval (float, optional): the crawler's per-key request spacing, the real api needs 2s. Defaults to 0.
+        max_workers (int, optional): crawler threads. Defaults to `crawler.MAX_WORKERS`.
+
+    Returns:
+        dict: `{"cold": {...}, "warm": {...}}` with time, requests/sec, cache hit ratio and the statuses served
+    """
+    feeds = [
+        Feed(name=feed.name, base_url=fake.base_url + urlparse(feed.base_url).path)
+        # both feeds, the union one is opt-in for the app
+        for feed in (crawler.SEVENS_FEED, crawler.UNION_FEED)
+    ]
+    os.environ.setdefault("SPORT_RADAR_API_KEY", "benchmark")
+    request_interval = crawler.REQUEST_INTERVAL_SECONDS
+    crawler.REQUEST_INTERVAL_SECONDS = interval
+    crawler._rate_limiters.clear()
+    try:
+        with in_temp_dir():
+            return {
+                "cold": _crawl(fake, feeds, max_workers),
+                "warm": _crawl(fake, feeds, max_workers),
+            }
+    finally:
+        crawler.REQUEST_INTERVAL_SECONDS = request_interval
+        crawler._rate_limiters.clear()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the crawler against a local fake sportradar api"
+    )
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--server-interval",
+        type=float,
+        default=0.0,
+        help="seconds between requests before the fake api answers 429",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.0,
+        help="the crawler's own spacing between requests",
+    )
+    parser.add_argument("--workers", type=int, default=crawler.MAX_WORKERS)
+    parser.add_argument("--generated-seasons", type=int, default=0)
+    parser.add_argument("--matches-per-season", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    with FakeSportradar(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        min_interval=args.server_interval,
+        generated_seasons=args.generated_seasons,
+        matches_per_season=args.matches_per_season,
+    ) as fake:
+        results = run(fake, args.interval, args.workers)
+
+    for name, result in results.items():
+        print(
+            f"{name:<5} {result['seconds']:>8.3f}s {result['requests']:>5} requests "
+            f"{result['requests_per_second'] or 0:>7.1f} req/s "
+            f"cache hit ratio {result['cache_hit_ratio'] or 0:.3f} "
+            f"statuses {result['statuses']}"
+        )
+    return 1 if any(result["failed_seasons"] for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.crawler --latency 0.2 --error-rate 0.05 --server-interval 1
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import hashlib
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape
+
+S3_XMLNS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+class FakeS3:
+    """A local stand-in for the s3 api, enough of it for `service.lambdas.utils.s3`.
+
+    Objects are kept in memory, keyed by (bucket, key), and any bucket exists. Path style
+    addressing only, which boto3 uses for a custom endpoint, e.g. with
+    `AWS_ENDPOINT_URL_S3=fake.endpoint_url`. Supports GetObject, HeadObject, PutObject,
+    DeleteObject and ListObjectsV2 (a single page).
+    """
+
+    def __init__(self):
+        self.statuses: Counter = Counter()
+        self.operations: Counter = Counter()
+        self._objects: Dict[Tuple[str, str], bytes] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def put(self, bucket: str, key: str, body: bytes) -> None:
+        with self._lock:
+            self._objects[(bucket, key)] = body
+
+    def get(self, bucket: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._objects.get((bucket, key))
+
+    def clear(self, bucket: str) -> None:
+        with self._lock:
+            for key in [k for k in self._objects if k[0] == bucket]:
+                del self._objects[key]
+
+    def keys(self, bucket: str, prefix: str = "") -> list:
+        with self._lock:
+            return sorted(
+                key
+                for b, key in self._objects
+                if b == bucket and key.startswith(prefix)
+            )
+
+    def _list_xml(self, bucket: str, prefix: str) -> bytes:
+        modified = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        contents = []
+        for key in self.keys(bucket, prefix):
+            body = self.get(bucket, key)
+            contents.append(
+                f"<Contents><Key>{escape(key)}</Key><LastModified>{modified}</LastModified>"
+                f'<ETag>"{hashlib.md5(body).hexdigest()}"</ETag><Size>{len(body)}</Size>'
+                "<StorageClass>STANDARD</StorageClass></Contents>"
+            )
+        return (
+            f'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult xmlns="{S3_XMLNS}">'
+            f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>"
+            f"<KeyCount>{len(contents)}</KeyCount><MaxKeys>1000</MaxKeys>"
+            f"<IsTruncated>false</IsTruncated>{''.join(contents)}</ListBucketResult>"
+        ).encode("utf-8")
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out as separate writes, don't let nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def _target(self) -> Tuple[str, str, dict]:
+                url = urlparse(self.path)
+                bucket, _, key = url.path.lstrip("/").partition("/")
+                return unquote(bucket), unquote(key), parse_qs(url.query)
+
+            def _respond(
+                self, operation: str, status: int, body: bytes = b"", headers=None
+            ) -> None:
+                with fake._lock:
+                    fake.statuses[status] += 1
+                    fake.operations[operation] += 1
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _not_found(self, operation: str, key: str) -> None:
+                body = (
+                    '<?xml version="1.0" encoding="UTF-8"?><Error><Code>NoSuchKey</Code>'
+                    f"<Message>The specified key does not exist.</Message><Key>{escape(key)}</Key></Error>"
+                ).encode("utf-8")
+                self._respond(operation, 404, body, {"Content-Type": "application/xml"})
+
+            def do_GET(self):
+                bucket, key, query = self._target()
+                if not key:
+                    prefix = query.get("prefix", [""])[0]
+                    body = fake._list_xml(bucket, prefix)
+                    self._respond(
+                        "ListObjectsV2", 200, body, {"Content-Type": "application/xml"}
+                    )
+                    return
+                body = fake.get(bucket, key)
+                if body is None:
+                    self._not_found("GetObject", key)
+                    return
+                self._respond(
+                    "GetObject",
+                    200,
+                    body,
+                    {"ETag": f'"{hashlib.md5(body).hexdigest()}"'},
+                )
+
+            def do_HEAD(self):
+                bucket, key, _ = self._target()
+                body = fake.get(bucket, key)
+                if body is None:
+                    self._respond("HeadObject", 404)
+                    return
+                self.send_response(200)
+                with fake._lock:
+                    fake.statuses[200] += 1
+                    fake.operations["HeadObject"] += 1
+                self.send_header("ETag", f'"{hashlib.md5(body).hexdigest()}"')
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+
+            def do_PUT(self):
+                bucket, key, _ = self._target()
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                if self.headers.get("Content-Encoding") == "aws-chunked":
+                    body = _decode_aws_chunked(body)
+                fake.put(bucket, key, body)
+                self._respond(
+                    "PutObject",
+                    200,
+                    headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'},
+                )
+
+            def do_DELETE(self):
+                bucket, key, _ = self._target()
+                with fake._lock:
+                    fake._objects.pop((bucket, key), None)
+                self._respond("DeleteObject", 204)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeS3":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeS3":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _decode_aws_chunked(body: bytes) -> bytes:
+    """Strip the chunk framing newer boto3 versions use to send checksums as trailers"""
+    decoded, rest = b"", body
+    while rest:
+        header, _, rest = rest.partition(b"\r\n")
+        size = int(header.split(b";")[0], 16)
+        if size == 0:
+            break
+        decoded, rest = decoded + rest[:size], rest[size + 2 :]
+    return decoded
@@ -0,0 +1,196 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+from . import synthetic
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures")
+
+# the season the summaries fixture belongs to, every other season is generated
+FIXTURE_SEASON_ID = "sr:season:105533"
+
+# the endpoints the crawler calls, after the feed's base path
+ENDPOINT_PATTERN = re.compile(
+    r"(/competitions\.json|/seasons\.json|/seasons/[^/]+/summaries\.json"
+    r"|/sport_events/[^/]+/summary\.json)$"
+)
+
+GENERATED_COMPETITION = {
+    "id": "sr:competition:synthetic",
+    "name": "Synthetic Series",
+    "gender": "men",
+}
+
+
+def _read_fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), "r") as file:
+        return json.load(file)
+
+
+class FakeSportradar:
+    """A local stand-in for the sportradar api, serving the fixtures plus generated seasons.
+
+    Any path prefix is accepted, so every feed can point at the same server, e.g.
+    `Feed(name="sevens", base_url=fake.base_url + "/rugby-sevens/trial/v3/en")`. Faults are
+    injected per request: latency, 5xx errors, and a 429 with `Retry-After` for requests closer
+    together than `min_interval` on the same api key.
+
+    Args:
+        latency (float, optional): seconds added to every response. Defaults to 0.
+        jitter (float, optional): up to this many random seconds more. Defaults to 0.
+        error_rate (float, optional): fraction of requests answered with a 503. Defaults to 0.
+        min_interval (float, optional): seconds a key must wait between requests, 0 for no limit. Defaults to 0.
+        generated_seasons (int, optional): extra seasons of synthetic summaries. Defaults to 0.
+        matches_per_season (int, optional): matches in each generated season. Defaults to 100.
+        seed (int, optional): for the injected faults and the generated seasons. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        min_interval: float = 0.0,
+        generated_seasons: int = 0,
+        matches_per_season: int = 100,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.min_interval = min_interval
+        self.statuses: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._last_request: Dict[str, float] = {}
+        self._responses = self._build_responses(
+            generated_seasons, matches_per_season, seed
+        )
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _build_responses(
+        self, generated_seasons: int, matches_per_season: int, seed: int
+    ) -> Dict[str, bytes]:
+        """Response body per path suffix, serialized once up front"""
+        competitions = _read_fixture("competitions")
+        seasons = _read_fixture("seasons")
+        fixture_summaries = _read_fixture("season_summaries")
+
+        summaries_by_season = {FIXTURE_SEASON_ID: fixture_summaries}
+        # the other fixture seasons get generated matches, tagged with their real season
+        real_seasons = [s for s in seasons["seasons"] if s["id"] != FIXTURE_SEASON_ID]
+        generated = list(
+            synthetic.season_summaries(
+                seasons=len(real_seasons) + generated_seasons,
+                matches_per_season=matches_per_season,
+                seed=seed,
+            )
+        )
+        for season, season_summary in zip(real_seasons, generated):
+            season_summary.pop("season")
+            season_summary.pop("competition")
+            summaries_by_season[season["id"]] = season_summary
+
+        if generated_seasons:
+            competitions["competitions"].append(GENERATED_COMPETITION)
+        for season_summary in generated[len(real_seasons) :]:
+            season = {
+                **season_summary.pop("season"),
+                "competition_id": GENERATED_COMPETITION["id"],
+            }
+            season_summary.pop("competition")
+            seasons["seasons"].append(season)
+            summaries_by_season[season["id"]] = season_summary
+
+        responses = {
+            "/competitions.json": competitions,
+            "/seasons.json": seasons,
+        }
+        for season_id, season_summary in summaries_by_season.items():
+            responses[f"/seasons/{season_id}/summaries.json"] = season_summary
+            for summary in season_summary["summaries"]:
+                responses[
+                    f"/sport_events/{summary['sport_event']['id']}/summary.json"
+                ] = summary
+        return {
+            path: json.dumps(body, separators=(",", ":")).encode("utf-8")
+            for path, body in responses.items()
+        }
+
+    def _fault(self, api_key: str) -> Optional[tuple]:
+        """(status, headers) of an injected failure, or None to serve the request"""
+        with self._lock:
+            now = time.monotonic()
+            if self.min_interval:
+                wait = self._last_request.get(api_key, 0.0) + self.min_interval - now
+                if wait > 0:
+                    return 429, {"Retry-After": str(max(1, round(wait)))}
+                self._last_request[api_key] = now
+            if self._random.random() < self.error_rate:
+                return 503, {}
+        return None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                api_key = parse_qs(query).get("api_key", [""])[0]
+                time.sleep(fake.latency + fake._random.uniform(0, fake.jitter))
+
+                fault = fake._fault(api_key)
+                endpoint = ENDPOINT_PATTERN.search(path)
+                endpoint = endpoint.group(1) if endpoint else None
+                if fault is not None:
+                    status, headers, body = *fault, b""
+                elif endpoint not in fake._responses:
+                    status, headers, body = 404, {}, b""
+                else:
+                    status, body = 200, fake._responses[endpoint]
+                    headers = {"Content-Type": "application/json"}
+
+                with fake._lock:
+                    fake.statuses[status] += 1
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        return sum(self.statuses.values())
+
+    def start(self) -> "FakeSportradar":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeSportradar":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,76 @@
+"""Import and invoke the etl handler in this process, run by `benchmarks.lambda_start`.
+
+Run as a script, not with -m, so nothing but the handler's own imports count towards its init:
+    python benchmarks/lambda_invoke.py <spec.json> <result.json>
+"""
+
+import time
+
+entered = time.time()
+
+import json
+import resource
+import sys
+
+IMPORT_MARKER = "lambda_invoke: importing the handler"
+
+
+def _peak_rss_mb() -> float:
+    # only ever run on linux (like the lambda runtime), where ru_maxrss is KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+class _Context:
+    """The parts of `LambdaContext` the handler's decorators read"""
+
+    def __init__(self, request_id: str):
+        self.aws_request_id = request_id
+        self.function_name = "lineal-world-title-etl"
+        self.function_version = "$LATEST"
+        self.memory_limit_in_mb = 1024
+        self.invoked_function_arn = (
+            "arn:aws:lambda:eu-west-2:000000000000:function:lineal-world-title-etl"
+        )
+        self.log_group_name = "/aws/lambda/lineal-world-title-etl"
+        self.log_stream_name = "benchmark"
+
+    def get_remaining_time_in_millis(self) -> int:
+        return 300_000
+
+
+def main(spec_path: str, result_path: str) -> None:
+    with open(spec_path, "r") as file:
+        spec = json.load(file)
+
+    # in place of this script's directory, as the lambda runtime puts the function's and the layer's
+    sys.path[:1] = spec["sys_path"]
+    # with -X importtime, everything logged after this line is the handler's init
+    print(IMPORT_MARKER, file=sys.stderr, flush=True)
+    modules_before = len(sys.modules)
+    start = time.perf_counter()
+    module = __import__(spec["module"], fromlist=["handler"])
+    init_ms = (time.perf_counter() - start) * 1000
+    init_rss_mb = _peak_rss_mb()
+    init_modules = len(sys.modules) - modules_before
+
+    handler_ms = []
+    for invocation in range(spec["invocations"]):
+        context = _Context(f"benchmark-{spec['run']}-{invocation}")
+        start = time.perf_counter()
+        module.handler(dict(spec["event"]), context)
+        handler_ms.append((time.perf_counter() - start) * 1000)
+
+    result = {
+        "startup_ms": (entered - spec["spawned_at"]) * 1000,
+        "init_ms": init_ms,
+        "init_modules": init_modules,
+        "init_rss_mb": init_rss_mb,
+        "handler_ms": handler_ms,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    with open(result_path, "w") as file:
+        json.dump(result, file)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2])
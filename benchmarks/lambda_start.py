@@ -0,0 +1,305 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from .fake_s3 import FakeS3
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LAMBDAS_DIR = os.path.join(ROOT_DIR, "service", "lambdas")
+INVOKE_SCRIPT = os.path.join(os.path.dirname(__file__), "lambda_invoke.py")
+
+# must match `lambda_invoke.IMPORT_MARKER`, the script is not imported so it stays out of the child
+IMPORT_MARKER = "lambda_invoke: importing the handler"
+
+BUCKET = "lineal-world-title-benchmark"
+POLL_PLAN_KEY = "poll_plan.json"
+
+# how the handler is imported: from the repo, or laid out like the deployed function and layer
+LAYOUTS = {
+    "repo": {
+        "sys_path": [ROOT_DIR],
+        "module": "service.lambdas.lineal_world_title_etl.index",
+    },
+    "bundle": {
+        "sys_path": [os.path.join(LAMBDAS_DIR, "lineal_world_title_etl"), LAMBDAS_DIR],
+        "module": "index",
+    },
+}
+
+# what the handler finds in s3, and the env it runs with
+SCENARIOS = ("skip", "due", "profile")
+
+
+def _trigger_time() -> datetime:
+    return datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _event(trigger_time: datetime) -> dict:
+    return {
+        "version": "0",
+        "id": "benchmark",
+        "detail-type": "Scheduled Event",
+        "source": "aws.events",
+        "account": "000000000000",
+        "time": trigger_time.isoformat().replace("+00:00", "Z"),
+        "region": "eu-west-2",
+        "resources": [],
+        "detail": {},
+    }
+
+
+def _seed(fake: FakeS3, scenario: str, trigger_time: datetime, objects: int) -> None:
+    """Reset the bucket to the scenario's starting state"""
+    fake.clear(BUCKET)
+    for i in range(objects):
+        fake.put(BUCKET, f"data/object_{i:05d}.json", b"{}")
+    if scenario == "skip":
+        # next poll is a week away, so every trigger is skipped after reading the plan
+        plan = {
+            "generated_at": trigger_time.isoformat(),
+            "valid_until": (trigger_time + timedelta(days=14)).isoformat(),
+            "poll_times": [(trigger_time + timedelta(days=7)).isoformat()],
+        }
+        fake.put(BUCKET, POLL_PLAN_KEY, json.dumps(plan).encode("utf-8"))
+    # without a plan "due" and "profile" poll on every trigger
+
+
+def _env(fake: FakeS3, scenario: str) -> Dict[str, str]:
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if not key.startswith(("AWS_", "POWERTOOLS_"))
+        and key != "SPORT_RADAR_API_KEY_SECRET_NAME"
+    }
+    env.update(
+        {
+            "AWS_ENDPOINT_URL_S3": fake.endpoint_url,
+            "AWS_ACCESS_KEY_ID": "benchmark",
+            "AWS_SECRET_ACCESS_KEY": "benchmark",
+            "AWS_DEFAULT_REGION": "eu-west-2",
+            "AWS_EC2_METADATA_DISABLED": "true",
+            "POWERTOOLS_SERVICE_NAME": "lineal-world-title-etl",
+            "POWERTOOLS_METRICS_NAMESPACE": "lineal-rugby-benchmark",
+            "POWERTOOLS_TRACE_DISABLED": "true",
+            "S3_BUCKET": BUCKET,
+            "PROFILE": "true" if scenario == "profile" else "false",
+            "PYTHONDONTWRITEBYTECODE": "1",
+        }
+    )
+    return env
+
+
+def _invoke(
+    layout: str,
+    env: Dict[str, str],
+    event: dict,
+    invocations: int,
+    run: int,
+    import_time: bool = False,
+) -> dict:
+    """Start a fresh interpreter that imports the handler and invokes it `invocations` times"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        spec_path = os.path.join(tmp_dir, "spec.json")
+        result_path = os.path.join(tmp_dir, "result.json")
+        spawned_at = time.time()
+        with open(spec_path, "w") as file:
+            json.dump(
+                {
+                    **LAYOUTS[layout],
+                    "event": event,
+                    "invocations": invocations,
+                    "run": run,
+                    "spawned_at": spawned_at,
+                },
+                file,
+            )
+        flags = ["-X", "importtime"] if import_time else []
+        process = subprocess.run(
+            [sys.executable, *flags, INVOKE_SCRIPT, spec_path, result_path],
+            env=env,
+            cwd=tmp_dir,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        if process.returncode != 0:
+            raise RuntimeError(f"Handler run failed:\n{process.stderr[-2000:]}")
+        with open(result_path, "r") as file:
+            result = json.load(file)
+    if import_time:
+        result["slowest_imports"] = _slowest_imports(
+            process.stderr, LAYOUTS[layout]["module"]
+        )
+    return result
+
+
+def _slowest_imports(stderr: str, module: str, top: int = 10) -> List[tuple]:
+    """(package, cumulative ms) of the slowest packages imported by `module`, from `-X importtime`.
+
+    Each package is timed where it is first imported, closest to the top of the import tree, so
+    a package pulled in by another (e.g. pydantic by powertools) counts towards that one.
+    """
+    shallowest: Dict[str, tuple] = {}
+    # interpreter startup imports are logged before the marker
+    _, _, stderr = stderr.partition(IMPORT_MARKER)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        depth = len(name) - len(name.lstrip())
+        package = name.strip().split(".")[0]
+        if package == module.split(".")[0]:
+            continue
+        if package not in shallowest or depth < shallowest[package][0]:
+            shallowest[package] = (depth, int(cumulative) / 1000)
+    imports = [(package, ms) for package, (_, ms) in shallowest.items()]
+    return sorted(imports, key=lambda x: x[1], reverse=True)[:top]
+
+
+def _s3_requests(fake: FakeS3) -> int:
+    return sum(fake.operations.values())
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def _summary(values: List[float]) -> dict:
+    return {
+        "median": round(statistics.median(values), 2),
+        "p95": round(_percentile(values, 0.95), 2),
+    }
+
+
+def run(
+    fake: FakeS3,
+    scenario: str,
+    layout: str = "repo",
+    cold_runs: int = 5,
+    warm_invocations: int = 20,
+    objects: int = 100,
+    import_time: bool = False,
+) -> dict:
+    """Measure cold starts, one fresh process per invocation, and warm starts, in one process.
+
+    Args:
+        fake (FakeS3): a started s3 stand-in, the bucket is reset for each run
+        scenario (str): one of `SCENARIOS`
+        layout (str, optional): one of `LAYOUTS`. Defaults to "repo".
+        cold_runs (int, optional): fresh processes to take the median over. Defaults to 5.
+        warm_invocations (int, optional): invocations after the first in the warm process. Defaults to 20.
+        objects (int, optional): objects in the bucket, listed on every due poll. Defaults to 100.
+        import_time (bool, optional): also report the slowest imports of one cold start. Defaults to False.
+
+    Returns:
+        dict: `{"cold": {...}, "warm": {...}}` of init and handler durations (ms), peak rss (MB) and
+            s3 requests (per invocation when warm)
+    """
+    trigger_time = _trigger_time()
+    event = _event(trigger_time)
+    env = _env(fake, scenario)
+
+    cold, cold_requests = [], []
+    for i in range(cold_runs):
+        _seed(fake, scenario, trigger_time, objects)
+        before = _s3_requests(fake)
+        cold.append(_invoke(layout, env, event, 1, i))
+        cold_requests.append(_s3_requests(fake) - before)
+
+    _seed(fake, scenario, trigger_time, objects)
+    before = _s3_requests(fake)
+    warm = _invoke(layout, env, event, 1 + warm_invocations, cold_runs)
+    # every cold run of a scenario makes the same requests, the rest are the warm invocations'
+    warm_requests = _s3_requests(fake) - before - max(cold_requests)
+
+    result = {
+        "cold": {
+            "startup_ms": _summary([r["startup_ms"] for r in cold]),
+            "init_ms": _summary([r["init_ms"] for r in cold]),
+            "handler_ms": _summary([r["handler_ms"][0] for r in cold]),
+            "init_modules": cold[0]["init_modules"],
+            "init_rss_mb": round(max(r["init_rss_mb"] for r in cold), 1),
+            "peak_rss_mb": round(max(r["peak_rss_mb"] for r in cold), 1),
+            "s3_requests": max(cold_requests),
+        },
+        "warm": {
+            "handler_ms": (
+                _summary(warm["handler_ms"][1:]) if warm_invocations else None
+            ),
+            "peak_rss_mb": round(warm["peak_rss_mb"], 1),
+            "s3_requests": (
+                warm_requests / warm_invocations if warm_invocations else None
+            ),
+        },
+    }
+    if import_time:
+        _seed(fake, scenario, trigger_time, objects)
+        result["slowest_imports"] = _invoke(
+            layout, env, event, 1, cold_runs + 1, import_time=True
+        )["slowest_imports"]
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark cold and warm starts of the etl lambda against a local s3"
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS
+    )
+    parser.add_argument("--layouts", nargs="+", default=["repo"], choices=list(LAYOUTS))
+    parser.add_argument("--cold-runs", type=int, default=5)
+    parser.add_argument("--warm-invocations", type=int, default=20)
+    parser.add_argument("--objects", type=int, default=100)
+    parser.add_argument("--import-time", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print the results as json")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with FakeS3() as fake:
+        for layout in args.layouts:
+            for scenario in args.scenarios:
+                results[f"{layout}.{scenario}"] = run(
+                    fake,
+                    scenario,
+                    layout,
+                    args.cold_runs,
+                    args.warm_invocations,
+                    args.objects,
+                    args.import_time,
+                )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    for name, result in results.items():
+        cold, warm = result["cold"], result["warm"]
+        print(
+            f"{name:<16} cold: startup {cold['startup_ms']['median']:>7.1f}ms "
+            f"init {cold['init_ms']['median']:>7.1f}ms ({cold['init_modules']} modules) "
+            f"handler {cold['handler_ms']['median']:>7.1f}ms "
+            f"rss {cold['init_rss_mb']:.1f}/{cold['peak_rss_mb']:.1f}MB "
+            f"s3 {cold['s3_requests']} req"
+        )
+        if warm["handler_ms"]:
+            print(
+                f"{'':<16} warm: handler {warm['handler_ms']['median']:>7.2f}ms "
+                f"p95 {warm['handler_ms']['p95']:>7.2f}ms rss {warm['peak_rss_mb']:.1f}MB "
+                f"s3 {warm['s3_requests']:.1f} req/invocation"
+            )
+        for package, ms in result.get("slowest_imports", []):
+            print(f"{'':<16} import {package:<40} {ms:>7.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.lambda_start --layouts repo bundle --import-time
+    sys.exit(main())
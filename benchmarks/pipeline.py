@@ -0,0 +1,200 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+from lineal_rugby import app
+from lineal_rugby.models import SportRadarData
+from . import synthetic
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# (seasons, matches per season), seasons alternate men and women
+SIZES = {
+    "10k": (10, 1_000),
+    "100k": (20, 5_000),
+}
+
+# a stage regresses when it is this much slower or bigger than its baseline
+DEFAULT_TOLERANCE = 1.5
+
+# differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.05
+MIN_PEAK_MB = 1.0
+
+
+@contextmanager
+def in_temp_dir():
+    """The pipeline writes to relative paths, keep them out of the real data directory.
+
+    Web assets go to `../web/assets`, so runs happen a level down to keep those in the temp dir too.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run_dir = os.path.join(tmp_dir, "run")
+        os.makedirs(run_dir)
+        os.chdir(run_dir)
+        try:
+            yield
+        finally:
+            os.chdir(cwd)
+
+
+def _stages(content: bytes) -> List[Tuple[str, Callable[[dict], None]]]:
+    """The pipeline of `app.main` as named steps sharing a state dict, minus the crawl and pages"""
+
+    def load(state):
+        state["data"] = SportRadarData.model_validate_json(content)
+
+    def to_lineal_cups(state):
+        state["cups"] = list(app._to_lineal_cups(state["data"]))
+
+    def for_each_cup(fn):
+        return lambda state: [fn(cup) for cup in state["cups"]]
+
+    return [
+        ("load", load),
+        ("to_lineal_cups", to_lineal_cups),
+        ("holders", for_each_cup(app.augment_cup_holders)),
+        ("reigns", for_each_cup(app.augment_cup_reigns)),
+        ("stats", for_each_cup(app.augment_cup_stats)),
+        ("write", for_each_cup(app.write_cup)),
+    ]
+
+
+def _time_pass(content: bytes) -> Dict[str, float]:
+    state, seconds = {}, {}
+    for name, stage in _stages(content):
+        gc.collect()
+        start = time.perf_counter()
+        stage(state)
+        seconds[name] = time.perf_counter() - start
+    return seconds
+
+
+def _memory_pass(content: bytes) -> Dict[str, float]:
+    """Peak memory allocated by each stage on top of what was already held, in MB"""
+    state, peak_mb = {}, {}
+    tracemalloc.start()
+    try:
+        for name, stage in _stages(content):
+            gc.collect()
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            stage(state)
+            _, peak = tracemalloc.get_traced_memory()
+            peak_mb[name] = (peak - before) / 2**20
+    finally:
+        tracemalloc.stop()
+    return peak_mb
+
+
+def run(
+    size: str, teams: int = 32, tie_rate: float = 0.02, memory: bool = True
+) -> dict:
+    """Time (and measure the memory of) every stage on synthetic data of a named size.
+
+    Timing and memory are separate passes, tracing allocations slows python down too much to time.
+
+    Returns:
+        dict: `{"matches": n, "stages": {stage: {"seconds": s, "peak_mb": mb}}}`
+    """
+    seasons, matches_per_season = SIZES[size]
+    content, matches = synthetic.sportradar_data_json(
+        teams=teams,
+        seasons=seasons,
+        matches_per_season=matches_per_season,
+        tie_rate=tie_rate,
+    )
+    with in_temp_dir():
+        seconds = _time_pass(content)
+        peak_mb = _memory_pass(content) if memory else {}
+
+    return {
+        "matches": matches,
+        "stages": {
+            name: {
+                "seconds": round(seconds[name], 4),
+                "peak_mb": round(peak_mb[name], 2) if name in peak_mb else None,
+            }
+            for name in seconds
+        },
+    }
+
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    found = []
+    for name, measured in result["stages"].items():
+        expected = baseline["stages"].get(name)
+        if expected is None:
+            continue
+        for metric, noise in (("seconds", MIN_SECONDS), ("peak_mb", MIN_PEAK_MB)):
+            if measured[metric] is None or expected[metric] is None:
+                continue
+            if measured[metric] > max(
+                expected[metric] * tolerance, expected[metric] + noise
+            ):
+                found.append(
+                    f"{name} {metric}: {measured[metric]} vs baseline {expected[metric]}"
+                )
+    return found
+
+
+def load_baselines() -> dict:
+    try:
+        with open(BASELINES_PATH, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the lineal cup pipeline on synthetic data"
+    )
+    parser.add_argument("--sizes", nargs="+", default=["10k"], choices=list(SIZES))
+    parser.add_argument("--teams", type=int, default=32)
+    parser.add_argument("--tie-rate", type=float, default=0.02)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument(
+        "--update-baselines",
+        action="store_true",
+        help=f"store the results in {os.path.basename(BASELINES_PATH)}",
+    )
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines()
+    failed = []
+    for size in args.sizes:
+        result = run(size, args.teams, args.tie_rate, memory=not args.no_memory)
+        print(f"{size} ({result['matches']} matches)")
+        for name, measured in result["stages"].items():
+            print(
+                f"  {name:<15} {measured['seconds']:>9.4f}s {measured['peak_mb'] or 0:>9.2f}MB"
+            )
+
+        if args.update_baselines:
+            baselines[size] = result
+        elif size in baselines:
+            for regression in regressions(result, baselines[size], args.tolerance):
+                failed.append(f"{size} {regression}")
+
+    if args.update_baselines:
+        with open(BASELINES_PATH, "w") as file:
+            json.dump(baselines, file, indent=2)
+            file.write("\n")
+
+    for regression in failed:
+        print(f"Regression: {regression}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.pipeline --sizes 10k 100k
+    sys.exit(main())
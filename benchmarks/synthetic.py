@@ -0,0 +1,129 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Tuple
+
+START = datetime(2016, 1, 1, tzinfo=timezone.utc)
+
+
+def _team(index: int, gender: str) -> dict:
+    name = f"Team {index:04d}"
+    return {
+        "id": f"sr:competitor:{gender}{index}",
+        "name": name,
+        "country": name,
+        "gender": "male" if gender == "men" else "female",
+    }
+
+
+def _summary(
+    rng: random.Random,
+    season: dict,
+    competition: dict,
+    match_id: str,
+    start_time: datetime,
+    home: dict,
+    away: dict,
+    tie_rate: float,
+) -> dict:
+    home_score = rng.randrange(0, 50)
+    if rng.random() < tie_rate:
+        away_score = home_score
+    else:
+        # any other score, uniformly
+        away_score = rng.randrange(0, 49)
+        if away_score >= home_score:
+            away_score += 1
+    status = {
+        "status": "closed",
+        "match_status": "ended",
+        "home_score": home_score,
+        "away_score": away_score,
+    }
+    if home_score == away_score:
+        status["match_tie"] = True
+    else:
+        status["winner_id"] = (home if home_score > away_score else away)["id"]
+
+    return {
+        "sport_event": {
+            "id": match_id,
+            "start_time": start_time.isoformat(),
+            "start_time_confirmed": True,
+            "sport_event_context": {
+                "sport": {"id": "sr:sport:12", "name": "Rugby"},
+                "category": {"id": "sr:category:1118", "name": "Rugby Union Sevens"},
+                "competition": competition,
+                "season": season,
+            },
+            "competitors": [
+                {**home, "qualifier": "home"},
+                {**away, "qualifier": "away"},
+            ],
+        },
+        "sport_event_status": status,
+    }
+
+
+def season_summaries(
+    teams: int = 32,
+    seasons: int = 10,
+    matches_per_season: int = 1000,
+    tie_rate: float = 0.02,
+    seed: int = 0,
+) -> Iterator[dict]:
+    """Sportradar-shaped season summaries, alternating men's and women's seasons.
+
+    Every match is an international between two random teams, played in time order, so the
+    pipeline keeps every one of them.
+    """
+    rng = random.Random(seed)
+    for season_index in range(seasons):
+        gender = "men" if season_index % 2 == 0 else "women"
+        competition = {
+            "id": f"sr:competition:{gender}",
+            "name": "Synthetic Series",
+            "gender": gender,
+        }
+        season_start = START + timedelta(days=365 * (season_index // 2))
+        season = {
+            "id": f"sr:season:{season_index}",
+            "name": f"Synthetic Series {season_index}",
+            "start_date": season_start.date().isoformat(),
+            "end_date": (season_start + timedelta(days=364)).date().isoformat(),
+            "year": str(season_start.year),
+            "competition_id": competition["id"],
+        }
+        step = timedelta(days=364) / max(matches_per_season, 1)
+        summaries = []
+        for match_index in range(matches_per_season):
+            home, away = rng.sample(range(teams), 2)
+            summaries.append(
+                _summary(
+                    rng,
+                    season,
+                    competition,
+                    f"sr:sport_event:{season_index}-{match_index}",
+                    season_start + step * match_index,
+                    _team(home, gender),
+                    _team(away, gender),
+                    tie_rate,
+                )
+            )
+        yield {
+            "generated_at": START.isoformat(),
+            "summaries": summaries,
+            "season": season,
+            "competition": competition,
+        }
+
+
+def sportradar_data_json(**kwargs) -> Tuple[bytes, int]:
+    """(`SportRadarData` json as written by the crawler, number of matches), see `season_summaries`"""
+    matches = 0
+    parts = []
+    for season_summary in season_summaries(**kwargs):
+        matches += len(season_summary["summaries"])
+        parts.append(json.dumps(season_summary, separators=(",", ":")))
+    content = '{"feed":"sevens","season_summaries":[' + ",".join(parts) + "]}"
+    return content.encode("utf-8"), matches
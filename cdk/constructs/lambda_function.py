@@ -18,6 +18,67 @@ from typing import Optional, List
 from ..config_base import ConfigBase
 
 
+def _bundling_command(
+    target_dir: str,
+    copy_dir: str,
+    precompile: bool = True,
+    strip: bool = True,
+    exclude_packages: Optional[List[str]] = None,
+    size_report: bool = True,
+) -> List[str]:
+    """Builds the docker bundling command, pip installing requirements.txt and copying the source.
+
+    Args:
+        target_dir [str]: directory to pip install requirements into, e.g. "/asset-output/python"
+        copy_dir [str]: directory to copy the source code into
+        precompile [bool]: compile .pyc files at build time, so the runtime doesn't on cold start
+        strip [bool]: remove tests, type stubs and dist-info files of installed packages, and caches, not needed at runtime
+        exclude_packages [Optional[List[str]]]: packages to remove after install, e.g. when provided by a shared layer
+        size_report [bool]: print the bundle size and largest packages to the synth output
+    """
+    # installed aside first, so stripping only ever touches installed packages, not the source
+    packages_dir = "/tmp/packages"
+    steps = [
+        f"mkdir -p {packages_dir}",
+        f"pip install --no-compile -r requirements.txt -t {packages_dir}",
+    ]
+    for package in exclude_packages or []:
+        # expects the import name, dist-info directories are normalized the same way e.g. pydantic_core
+        package = package.replace("-", "_")
+        steps.append(
+            f"rm -rf {packages_dir}/{package} {packages_dir}/{package}-*.dist-info"
+        )
+    if strip:
+        steps += [
+            f"find {packages_dir} -depth -type d \\( -name tests -o -name test \\) -exec rm -rf {{}} +",
+            f"find {packages_dir} -type f -name '*.pyi' -delete",
+            # keep METADATA, importlib.metadata.version() is used by some packages at runtime
+            f"find {packages_dir} -path '*.dist-info/*' ! -name METADATA ! -name entry_points.txt -delete",
+        ]
+    steps += [
+        f"mkdir -p {target_dir}",
+        f"cp -a {packages_dir}/. {target_dir}",
+        f"cp -au . {copy_dir}",
+    ]
+    if strip:
+        # caches from a local checkout of the source, precompile writes fresh ones
+        steps += [
+            "find /asset-output -depth -type d -name __pycache__ -exec rm -rf {} +",
+            "find /asset-output -type f -name '*.pyc' -delete",
+        ]
+    if precompile:
+        # unchecked-hash pycs stay valid regardless of the mtimes the asset zip ends up with
+        steps.append(
+            "python -m compileall -q -j 0 --invalidation-mode unchecked-hash /asset-output"
+        )
+    if size_report:
+        steps += [
+            'echo "bundle size: $(du -sh /asset-output | cut -f1)"',
+            f"du -sk {target_dir}/* | sort -rn | head -10",
+        ]
+    return ["bash", "-c", " && ".join(steps)]
+
+
 class PythonLambdaFunction(_lambda.Function):
 
     def __init__(
@@ -37,6 +98,10 @@ class PythonLambdaFunction(_lambda.Function):
         layers: Optional[List[_lambda.ILayerVersion]] = None,
         runtime: Optional[_lambda.Runtime] = _lambda.Runtime.PYTHON_3_11,
         architecture: Optional[_lambda.Architecture] = _lambda.Architecture.X86_64,
+        precompile: bool = True,
+        strip: bool = True,
+        exclude_packages: Optional[List[str]] = None,
+        size_report: bool = True,
         **kwargs,
     ):
         """Creates a python aws lamdba function, including packaging from requirements.txt, with sensible defaults.
@@ -57,6 +122,10 @@ class PythonLambdaFunction(_lambda.Function):
             layers [Optional[List[_lambda.ILayerVersion]]]: list of lambda layers to include in the function, e.g. utils, power tools
             runtime [Optional[_lambda.Runtime]]: lambda runtime, default is python 3.11
             architecture [Optional[_lambda.Architecture]]: lambda architecture, default is X86_64
+            precompile [bool]: ship precompiled .pyc files, default is True
+            strip [bool]: strip tests, type stubs and dist-info from installed packages, default is True
+            exclude_packages [Optional[List[str]]]: packages to drop from the bundle as a layer provides them, e.g. ["pydantic_core", "requests"]
+            size_report [bool]: print the bundle size and largest packages when synthesizing, default is True
             **kwargs: any other kwargs to pass down to cdk construct (see https://github.com/aws/aws-cdk/tree/main/packages/aws-cdk-lib/aws-lambda)
         """
         if id is None:
@@ -76,11 +145,14 @@ class PythonLambdaFunction(_lambda.Function):
                 path=entry,
                 bundling=BundlingOptions(
                     image=runtime.bundling_image,
-                    command=[
-                        "bash",
-                        "-c",
-                        "pip install -r requirements.txt -t /asset-output && cp -au . /asset-output",
-                    ],
+                    command=_bundling_command(
+                        target_dir="/asset-output",
+                        copy_dir="/asset-output",
+                        precompile=precompile,
+                        strip=strip,
+                        exclude_packages=exclude_packages,
+                        size_report=size_report,
+                    ),
                 ),
             ),
             handler=handler,
@@ -161,6 +233,9 @@ class PythonLambdaLayerVersion(_lambda.LayerVersion):
         description: Optional[str] = None,
         runtime: Optional[_lambda.Runtime] = _lambda.Runtime.PYTHON_3_11,
         architecture: Optional[_lambda.Runtime] = _lambda.Architecture.X86_64,
+        precompile: bool = True,
+        strip: bool = True,
+        size_report: bool = True,
         **kwargs,
     ):
         """Creates a lamdba layer, including packaging from requirements.txt, for shared code in the stack.
@@ -173,6 +248,9 @@ class PythonLambdaLayerVersion(_lambda.LayerVersion):
             description [Optional[str]]: short description of the lambda layer
             runtime [Optional[aws_cdk.aws_lambda.Runtime]]: lambda runtime, default is python 3.11
             architecture [Optional[aws_cdk.aws_lambda.Architecture]]: lambda architecture, default is X86_64
+            precompile [bool]: ship precompiled .pyc files, default is True
+            strip [bool]: strip tests, type stubs and dist-info from installed packages, default is True
+            size_report [bool]: print the layer size and largest packages when synthesizing, default is True
             **kwargs: any other kwargs to pass down to cdk construct (see https://github.com/aws/aws-cdk/tree/main/packages/aws-cdk-lib/aws-lambda)
         """
         module_name = os.path.split(entry)[-1]
@@ -193,11 +271,13 @@ class PythonLambdaLayerVersion(_lambda.LayerVersion):
                 entry,
                 bundling=BundlingOptions(
                     image=runtime.bundling_image,
-                    command=[
-                        "bash",
-                        "-c",
-                        f"pip install -r requirements.txt -t /asset-output/python && cp -au . /asset-output/python/{module_name}",
-                    ],
+                    command=_bundling_command(
+                        target_dir="/asset-output/python",
+                        copy_dir=f"/asset-output/python/{module_name}",
+                        precompile=precompile,
+                        strip=strip,
+                        size_report=size_report,
+                    ),
                 ),
             ),
             compatible_runtimes=[runtime],
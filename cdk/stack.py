@@ -69,16 +69,23 @@ class ServiceStack(Stack):
             s3_bucket_arns=[s3_bucket.bucket_arn],
         )
 
-        powertools_layer = PythonLambdaLayerVersion.lambda_powertools(
+        powertools_layer = PythonLambdaLayerVersion.lambda_powertools_layer(
             stack=self,
             config=config,
         )
 
+        # shared code plus the heavy dependencies (pydantic-core, requests), so function bundles stay small
+        utils_layer = PythonLambdaLayerVersion(
+            stack=self,
+            config=config,
+            entry=os.path.join(source_dir, "lambdas", "utils"),
+        )
+
         etl_function = PythonLambdaFunction(
             stack=self,
             config=config,
             id=f"ptl-school-signup-handler",
-            entry=os.path.join(source_dir, "lambdas", "lineal_worl_title_etl"),
+            entry=os.path.join(source_dir, "lambdas", "lineal_world_title_etl"),
             description="update website data with latest results",
             role=lambda_role,
             handler="index.handler",
@@ -99,5 +106,5 @@ class ServiceStack(Stack):
                     description="Trigger the `lineal-rugby` lambda function",
                 )
             ],
-            layers=[powertools_layer],
+            layers=[powertools_layer, utils_layer],
         )
@@ -3,10 +3,39 @@
 # aws sso login --profile andysprague44
 # export AWS_PROFILE=andysprague44
 
-# deploy html files to s3 bucket
-for f in $(find ./web_static -type f); do
-    aws s3 cp $f s3://www.rugbylinealworldtitledata.com/$(basename $f)
+# deploy html files and assets to s3 bucket
+# where the pipeline wrote a precompressed .gz sibling, upload those bytes with a content-encoding header
+cd web_static
+for f in $(find . -type f ! -name '*.gz' ! -name '*.br' | sed 's|^\./||'); do
+    case $f in
+        *.html) content_type="text/html" ;;
+        *.css) content_type="text/css" ;;
+        *.json) content_type="application/json" ;;
+        *) content_type="" ;;
+    esac
+
+    # assets have content-hashed names so can be cached forever, pages are revalidated
+    if [[ $f == assets/* ]]; then
+        cache_control="public, max-age=31536000, immutable"
+    else
+        cache_control="public, max-age=300"
+    fi
+
+    if [ -f "$f.gz" ] && [ -n "$content_type" ]; then
+        aws s3 cp "$f.gz" "s3://www.rugbylinealworldtitledata.com/$f" \
+            --content-encoding gzip --content-type "$content_type" --cache-control "$cache_control"
+    else
+        aws s3 cp "$f" "s3://www.rugbylinealworldtitledata.com/$f" --cache-control "$cache_control"
+    fi
 done
+cd ..
+
+# publish the poll plan the etl lambda reads, it re-reads the plan once its ETag changes
+# must match the lambda's S3_BUCKET and POLL_PLAN_S3_KEY, see cdk/stack.py
+if [ -f data/poll_plan.json ]; then
+    aws s3 cp data/poll_plan.json "s3://${POLL_PLAN_S3_BUCKET:-lineal-rugby}/poll_plan.json" \
+        --content-type application/json
+fi
 
 # invalidate in cloudfront to refresh cache
 aws cloudfront create-invalidation --distribution-id E3UX699K30BAAY --paths "/*" >> /dev/null
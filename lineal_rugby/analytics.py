@@ -0,0 +1,194 @@
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from typing import Dict, List
+from . import output
+from .models import LinealCup
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # optional, install the "analytics" extra to export parquet
+    pa = ds = None
+
+ANALYTICS_DIR = "analytics"
+
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    """Team and competition names repeat on every row, so they are dictionary encoded"""
+    name = pa.dictionary(pa.int32(), pa.string())
+    timestamp = pa.timestamp("us", tz="UTC")
+    partitions = [pa.field("gender", pa.string()), pa.field("year", pa.int16())]
+    return {
+        "events": pa.schema(
+            [
+                pa.field("start_time", timestamp, nullable=False),
+                pa.field("winner_name", name, nullable=False),
+                pa.field("loser_name", name, nullable=False),
+                pa.field("is_tie", pa.bool_(), nullable=False),
+                pa.field("competition_name", name, nullable=False),
+                pa.field("sport_event_id", pa.string()),
+                pa.field("winner_score", pa.int16()),
+                pa.field("loser_score", pa.int16()),
+                *partitions,
+            ]
+        ),
+        "holders": pa.schema(
+            [
+                pa.field("start_time", timestamp, nullable=False),
+                pa.field("holder", name, nullable=False),
+                *partitions,
+            ]
+        ),
+        "reigns": pa.schema(
+            [
+                pa.field("holder", name, nullable=False),
+                pa.field("start_time", timestamp, nullable=False),
+                pa.field("end_time", timestamp),
+                pa.field("matches", pa.int32(), nullable=False),
+                *partitions,
+            ]
+        ),
+    }
+
+
+def _table(schema: "pa.Schema", columns: Dict[str, list]) -> "pa.Table":
+    """Build every column in one call per column, dictionary columns are encoded by arrow"""
+    arrays = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            array = pa.array(columns[field.name], pa.string()).dictionary_encode()
+        else:
+            array = pa.array(columns[field.name], field.type)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _years(times: List[datetime]) -> List[int]:
+    return [t.year for t in times]
+
+
+def cup_tables(model: LinealCup) -> Dict[str, "pa.Table"]:
+    """The events, holder entries and reigns of a cup as arrow tables"""
+    schemas = _schemas()
+    events = model.events
+    start_times = [e.start_time for e in events]
+    tables = {
+        "events": _table(
+            schemas["events"],
+            {
+                "start_time": start_times,
+                "winner_name": [e.winner_name for e in events],
+                "loser_name": [e.loser_name for e in events],
+                "is_tie": [e.is_tie for e in events],
+                "competition_name": [e.competition_name for e in events],
+                "sport_event_id": [e.sport_event_id for e in events],
+                "winner_score": [e.winner_score for e in events],
+                "loser_score": [e.loser_score for e in events],
+                "gender": [model.gender] * len(events),
+                "year": _years(start_times),
+            },
+        )
+    }
+
+    holders = model.holders.holders if model.holders else []
+    start_times = [h.start_time for h in holders]
+    tables["holders"] = _table(
+        schemas["holders"],
+        {
+            "start_time": start_times,
+            "holder": [h.holder for h in holders],
+            "gender": [model.gender] * len(holders),
+            "year": _years(start_times),
+        },
+    )
+
+    reigns = model.reigns or []
+    start_times = [r.start_time for r in reigns]
+    tables["reigns"] = _table(
+        schemas["reigns"],
+        {
+            "holder": [r.holder for r in reigns],
+            "start_time": start_times,
+            "end_time": [r.end_time for r in reigns],
+            "matches": [r.matches for r in reigns],
+            "gender": [model.gender] * len(reigns),
+            "year": _years(start_times),
+        },
+    )
+    return tables
+
+
+def table_path(table: str) -> str:
+    return output.data_path(os.path.join(ANALYTICS_DIR, table))
+
+
+def _write_partition(table: "pa.Table", path: str, gender: str) -> None:
+    """Replace the gender's partition by pointing it at a new version in a single rename.
+
+    `{table}/gender={gender}` is a symlink to a dot prefixed version directory, which dataset
+    discovery skips, laid out as `year={year}/part-0.parquet`. Readers see either the old or the
+    new version, never a missing or half written one.
+    """
+    os.makedirs(path, exist_ok=True)
+    final = os.path.join(path, f"gender={gender}")
+    version = tempfile.mkdtemp(dir=path, prefix=f".gender={gender}-")
+    link = os.path.join(path, f".tmp-gender={gender}")
+    try:
+        ds.write_dataset(
+            table.drop_columns(["gender"]),
+            version,
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([pa.field("year", pa.int16())]), flavor="hive"
+            ),
+            basename_template="part-{i}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(os.path.basename(version), link)
+        if os.path.isdir(final) and not os.path.islink(final):
+            # exported before partitions were versioned, a rename can't replace a directory
+            shutil.rmtree(final)
+        os.replace(link, final)
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+
+    # earlier versions, and any left behind by a crash
+    for name in os.listdir(path):
+        old = os.path.join(path, name)
+        if name.startswith(f".gender={gender}-") and old != version:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def export_cup(model: LinealCup) -> bool:
+    """Write the cup's events, holders and reigns under `data/analytics/{table}/gender={gender}/`.
+
+    Each table is a hive partitioned parquet dataset, by gender then calendar year of the start
+    time, so e.g. `pyarrow.dataset.dataset(path, partitioning="hive")` or pandas/duckdb can prune
+    to the partitions and columns a query needs. Only the cup's own gender partition is replaced.
+
+    Returns:
+        bool: False if pyarrow is not installed and nothing was exported
+    """
+    if pa is None:
+        return False
+    for name, table in cup_tables(model).items():
+        _write_partition(table, table_path(name), model.gender)
+    return True
+
+
+def read_table(table: str) -> "pa.Table":
+    """A whole exported table, with `gender` and `year` back as columns"""
+    return ds.dataset(
+        table_path(table), format="parquet", partitioning="hive"
+    ).to_table()
+
+
+if __name__ == "__main__":
+    # python -m lineal_rugby.analytics events
+    print(read_table(sys.argv[1]))
@@ -1,31 +1,33 @@
-from collections import Counter
-import requests
-import time
-import json
-from typing import Tuple
+import os
+from typing import Any, Dict, Tuple
 from .models import *
-from .config import Config
-
-config = Config()
-
-
-def get_json(url):
-    response = requests.request("GET", url + f"?api_key={config.SPORT_RADAR_API_KEY}")
-    response.raise_for_status()
-    time.sleep(2)  # avoid rate limiting
-    return response.json()
+from . import (
+    analytics,
+    changefeed,
+    details,
+    eventlog,
+    history,
+    holders,
+    instrument,
+    output,
+    pages,
+    scheduler,
+    shards,
+    stages,
+)
+from .crawler import FEEDS, SEVENS_FEED, crawl_feeds, load_feed_data
 
 
 def _to_lineal_cup_event(summary: Summary) -> LinealCupEvent:
     """Get all the info we need for tracking lineal cup holder"""
     winner_id = summary.sport_event_status.winner_id
-    if winner_id:
-        winner = [c for c in summary.sport_event.competitors if c.id == winner_id][0]
-        looser = [c for c in summary.sport_event.competitors if c.id != winner_id][0]
-    else:
-        # match tied
-        winner = summary.sport_event.competitors[0]
-        looser = summary.sport_event.competitors[1]
+    competitors = summary.sport_event.competitors
+    # a match has exactly 2 competitors, so the loser is the other index. A tie keeps the listed order
+    winner_idx = 1 if winner_id is not None and competitors[1].id == winner_id else 0
+    winner = competitors[winner_idx]
+    looser = competitors[1 - winner_idx]
+
+    winner_score, loser_score = details.scores(summary, winner.id)
 
     return LinealCupEvent(
         start_time=summary.sport_event.start_time,
@@ -34,53 +36,72 @@ def _to_lineal_cup_event(summary: Summary) -> LinealCupEvent:
         is_tie=(winner_id is None),
         gender=summary.sport_event.sport_event_context.competition.gender,
         competition_name=summary.sport_event.sport_event_context.competition.name,
+        sport_event_id=summary.sport_event.id,
+        winner_score=winner_score,
+        loser_score=loser_score,
     )
 
 
-def _get_rugby_sevens_sportradar_data() -> SportRadarData:
-    base_url = "https://api.sportradar.com/rugby-sevens/trial/v3/en"
-    competitions = get_json(f"{base_url}/competitions.json")
-    competitions = Competitions(**competitions).competitions
-
-    seasons_json = get_json(f"{base_url}/seasons.json")
-    seasons = Seasons(**seasons_json).seasons
-
-    data = SportRadarData()
-
-    for season in seasons:
-        print("Running season:", season.name)
-        season_summary_json = get_json(f"{base_url}/seasons/{season.id}/summaries.json")
-        season_summary = SeasonSummary(**season_summary_json)
-        season_summary.season = season
-        season_summary.competition = next(
-            comp for comp in competitions if comp.id == season.competition_id
-        )
-        data.season_summaries.append(season_summary)
+def _counts(summary: Summary, event_filter: EventFilter) -> bool:
+    """Whether a match counts towards a cup, decided in a single pass over its fields"""
+    if summary.sport_event_status.match_status not in event_filter.match_statuses:
+        return False
+    if (
+        event_filter.internationals_only
+        and summary.sport_event.competitors[0].country is None
+    ):
+        return False
+    competition = summary.sport_event.sport_event_context.competition
+    name = competition.name.casefold()
+    if any(k.casefold() in name for k in event_filter.exclude_competition_keywords):
+        return False
+    return not event_filter.genders or competition.gender in event_filter.genders
+
+
+def _to_lineal_cup_events(
+    data: SportRadarData, event_filter: EventFilter
+) -> List[LinealCupEvent]:
+    """Convert every season's summaries that count towards a cup"""
+    return [
+        _to_lineal_cup_event(summary)
+        for season_summary in data.season_summaries
+        for summary in season_summary.summaries
+        if _counts(summary, event_filter)
+    ]
 
-    with open("data/sportradar_data.json", "w") as file:
-        file.write(data.model_dump_json(indent=4))
 
+def _get_rugby_sevens_sportradar_data() -> SportRadarData:
+    """Crawl every feed, returning the sevens data the cups are built from"""
+    results = crawl_feeds(FEEDS)
+    for feed, (_, report) in results.items():
+        if report.error:
+            print(f"Failed to crawl the {feed} feed: {report.error}")
+        elif report.failed:
+            print(
+                f"Failed to fetch {len(report.failed)} {feed} season(s), see data/{feed}/crawl_report.json. "
+                "Completed seasons are checkpointed, re-run to resume."
+            )
+
+    data, report = results[SEVENS_FEED.name]
+    if report.error or report.failed:
+        raise RuntimeError(f"Incomplete crawl of the {SEVENS_FEED.name} feed")
     return data
 
 
+def _with_history(events: List[LinealCupEvent]) -> List[LinealCupEvent]:
+    """Prepend imported historic results (see `lineal_rugby.history`) from before the sportradar data"""
+    history_events = list(
+        history.iter_history(events[0].gender, before=events[0].start_time)
+    )
+    return history_events + events
+
+
 def _to_lineal_cups(
     data: SportRadarData,
+    event_filter: Optional[EventFilter] = None,
 ) -> Tuple[LinealCup, LinealCup]:
     """Return 2 lineal cup models, 1 for men, one for women"""
-    season_summaries = []
-    for season_summary in data.season_summaries:
-        season_summaries += season_summary.summaries
-
-    events: List[LinealCupEvent] = []
-
-    events += [
-        _to_lineal_cup_event(summary)
-        for summary in season_summaries
-        # completed matches only
-        if summary.sport_event_status.match_status == "ended"
-        # internationals only
-        and summary.sport_event.competitors[0].country is not None
-    ]
+    events = _to_lineal_cup_events(data, event_filter or EventFilter())
 
     events.sort(key=lambda event: event.start_time)
 
@@ -89,101 +110,139 @@ def _to_lineal_cups(
         men_sevens_lineal_cup = LinealCup(
             competition_name=men_sevens_events[0].competition_name,
             gender=men_sevens_events[0].gender,
-            events=men_sevens_events,
+            events=_with_history(men_sevens_events),
         )
-        with open("data/men_lineal_cup.json", "w") as file:
-            file.write(men_sevens_lineal_cup.model_dump_json(indent=4))
 
     women_sevens_events = [event for event in events if event.gender != "men"]
     if women_sevens_events:
         womens_sevens_lineal_cup = LinealCup(
             competition_name=women_sevens_events[0].competition_name,
             gender=women_sevens_events[0].gender,
-            events=women_sevens_events,
+            events=_with_history(women_sevens_events),
         )
-        with open("data/women_lineal_cup.json", "w") as file:
-            file.write(womens_sevens_lineal_cup.model_dump_json(indent=4))
 
     return men_sevens_lineal_cup, womens_sevens_lineal_cup
 
 
 def augment_cup_holders(model: LinealCup) -> None:
-    events = model.events
-    events.sort(key=lambda event: event.start_time)
+    """Title matches and holder entries of a cup, see `holders.iter_title_matches`"""
+    model.events.sort(key=lambda event: event.start_time)
 
-    current_holder = None
     model.holders = LinearCupHolders()
-    model.holders.holders = []
-
-    for event in events:
-        if current_holder is None and event.is_tie:
-            # first event is a tie, no holder yet
-            current_holder = None
-
-        elif current_holder is None:
-            # first event
-            current_holder = event.winner_name
-            model.holders.holders.append(
-                LinearCupHolder(start_time=event.start_time, holder=current_holder)
-            )
-
-        elif event.winner_name == current_holder or event.loser_name == current_holder:
-            if not event.is_tie:
-                current_holder = event.winner_name
-            # else current_holder remains the same
-
-            # still want to append the event if it's a tie, as the holder gets another 'point'
-            model.holders.holders.append(
-                LinearCupHolder(start_time=event.start_time, holder=current_holder)
-            )
-
-        # else ignore any game *not* involving the current holder
+    model.title_matches = list(holders.iter_title_matches(model.events))
+    model.holders.holders = [
+        LinearCupHolder(start_time=match.start_time, holder=match.holder)
+        for match in model.title_matches
+    ]
+    model.current_holder = (
+        model.title_matches[-1].holder if model.title_matches else None
+    )
 
-    model.current_holder = current_holder
 
-    with open(f"data/{model.gender}_lineal_cup_holders.json", "w") as file:
-        file.write(model.holders.model_dump_json(indent=4))
+def augment_cup_reigns(model: LinealCup) -> None:
+    """Group consecutive title matches with the same holder into reigns"""
+    model.reigns = []
+    for entry in model.holders.holders:
+        holders.update_reigns(model.reigns, entry)
 
 
 def augment_cup_stats(model: LinealCup) -> None:
-    holder_names = [x.holder for x in model.holders.holders]
-    holder_counts = dict(
-        sorted(
-            Counter(holder_names).items(),
-            key=lambda x: x[1],
-            reverse=True,
-        )
+    stats = holders.HolderStats()
+    for entry in model.holders.holders:
+        stats.update(entry.holder)
+    model.statistics = stats.statistics()
+
+
+# computed by `augment_cup` in a worker and copied back onto the parent's cup
+DERIVED_FIELDS = ("holders", "title_matches", "current_holder", "reigns", "statistics")
+
+
+def augment_cup(model: LinealCup) -> Dict[str, Any]:
+    """The cpu bound part of building a cup, independent of every other cup and free of i/o"""
+    with instrument.stage(f"holders.{model.gender}") as span:
+        augment_cup_holders(model)
+        augment_cup_reigns(model)
+        span["items"] = len(model.events)
+    with instrument.stage(f"stats.{model.gender}") as span:
+        augment_cup_stats(model)
+        span["items"] = len(model.holders.holders)
+    return {field: getattr(model, field) for field in DERIVED_FIELDS}
+
+
+def write_cup(model: LinealCup) -> None:
+    # one line per entry, written as it is serialized rather than dumped as one json string
+    sink = holders.JsonLinesSink(holders.holders_path(model.gender))
+    for match in model.title_matches:
+        sink.write(match)
+    sink.close()
+
+    # serialized once, the web copy gets precompressed siblings for the server to send as-is
+    statistics_json = output.serialize(model.statistics)
+    output.write(
+        output.data_path(f"{model.gender}_lineal_cup_stats.json"), statistics_json
     )
-    wins_by_country = [
-        LinealCupWinsByCountry(country=k, wins=v) for k, v in holder_counts.items()
-    ]
-    model.statistics = LinealCupStatistics(
-        currentHolder=model.current_holder,
-        winsByCountry=wins_by_country,
+    output.write(
+        output.web_asset_path(f"{model.gender}_lineal_cup_stats.json"),
+        statistics_json,
+        precompress=True,
+    )
+    # lets `ingest` apply a single new result without recomputing the cup
+    output.write(
+        holders.state_path(model.gender),
+        LinealCupHolderState(
+            competition_name=model.competition_name,
+            gender=model.gender,
+            reigns=model.reigns,
+        ),
     )
 
-    with open(f"data/{model.gender}_lineal_cup_stats.json", "w") as file:
-        file.write(model.statistics.model_dump_json(indent=4))
 
-    with open(f"../web/assets/{model.gender}_lineal_cup_stats.json", "w") as file:
-        file.write(model.statistics.model_dump_json(indent=4))
+def publish_cup(model: LinealCup) -> None:
+    """Write every output of a computed cup, except the pages which cover all cups"""
+    write_cup(model)
+    eventlog.sync(model)
+    # parquet for analysis, skipped unless pyarrow is installed
+    analytics.export_cup(model)
+    shards.write_shards(model)
+    changefeed.publish_changes(model)
 
 
-def main(load=False):
-    if load:
-        data = _get_rugby_sevens_sportradar_data()
+def _run(load: bool) -> None:
+    # each stage logs its wall and cpu time, peak rss, items and counters, see `instrument.stage`
+    with instrument.stage("fetch" if load else "parse") as span:
+        if load:
+            data = _get_rugby_sevens_sportradar_data()
+        else:
+            data = load_feed_data(SEVENS_FEED.name)
+        span["items"] = sum(len(s.summaries) for s in data.season_summaries)
 
-    else:
-        with open("data/sportradar_data.json", "r") as file:
-            data = SportRadarData(**json.load(file))
+    output.write(output.data_path("poll_plan.json"), scheduler.build_poll_plan(data))
 
-    men_sevens_lineal_cup, womens_sevens_lineal_cup = _to_lineal_cups(data)
+    with instrument.stage("convert") as span:
+        cups = list(_to_lineal_cups(data))
+        span["items"] = sum(len(cup.events) for cup in cups)
 
-    augment_cup_holders(womens_sevens_lineal_cup)
-    augment_cup_holders(men_sevens_lineal_cup)
+    # cups are independent, so they are computed in parallel once there are enough events
+    for cup, derived in zip(cups, stages.map_cups(augment_cup, cups)):
+        for field, value in derived.items():
+            setattr(cup, field, value)
 
-    augment_cup_stats(womens_sevens_lineal_cup)
-    augment_cup_stats(men_sevens_lineal_cup)
+    with instrument.stage("details") as span:
+        for cup in cups:
+            # only calls the api for title matches with no scores that are not already cached
+            details.augment_title_match_details(cup, fetch=load)
+        span["items"] = sum(len(cup.title_matches) for cup in cups)
+
+    # every file is written here, after all the computation is done
+    with instrument.stage("write"):
+        for cup in cups:
+            publish_cup(cup)
+        pages.render_pages(cups)
+
+
+def main(load=False):
+    with instrument.profiled(os.environ.get(instrument.PROFILE_ENV)):
+        _run(load)
 
     print("Done!")
 
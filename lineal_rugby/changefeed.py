@@ -0,0 +1,144 @@
+import os
+from typing import Dict, List, Optional, Tuple
+from . import output
+from .models import (
+    LinealCup,
+    LinealCupChange,
+    LinealCupChangeFeedState,
+    LinealCupTitleMatch,
+)
+
+
+def _feed_path(gender: str) -> str:
+    return output.data_path(f"{gender}_lineal_cup_changes.jsonl")
+
+
+def _state_path(gender: str) -> str:
+    return output.data_path(f"{gender}_lineal_cup_changes_state.json")
+
+
+def _match_key(match: LinealCupTitleMatch) -> Tuple:
+    # the result can be corrected upstream, so a match is identified by when and who, not the winner
+    return (match.start_time, *sorted([match.winner_name, match.loser_name]))
+
+
+def _result(match: LinealCupTitleMatch) -> Tuple:
+    # what a correction changes, fields added to the model later don't make every match differ
+    return (
+        match.start_time,
+        match.holder,
+        match.winner_name,
+        match.loser_name,
+        match.is_tie,
+    )
+
+
+def _append(gender: str, changes: List[LinealCupChange]) -> None:
+    if changes:
+        os.makedirs(os.path.dirname(_feed_path(gender)) or ".", exist_ok=True)
+        with open(_feed_path(gender), "a") as file:
+            file.write("".join(change.model_dump_json() + "\n" for change in changes))
+
+
+def load_state(gender: str) -> Optional[LinealCupChangeFeedState]:
+    try:
+        with open(_state_path(gender), "rb") as file:
+            return LinealCupChangeFeedState.model_validate_json(file.read())
+    except FileNotFoundError:
+        return None
+
+
+def diff(
+    previous: List[LinealCupTitleMatch],
+    current: List[LinealCupTitleMatch],
+    gender: str,
+    last_sequence: int = 0,
+) -> List[LinealCupChange]:
+    """Changes to the title matches between two runs, in match order, numbered from `last_sequence + 1`"""
+    previous_by_key: Dict[Tuple, LinealCupTitleMatch] = {
+        _match_key(m): m for m in previous
+    }
+    current_keys = set()
+
+    changes = []
+    holder = None
+    for match in current:
+        key = _match_key(match)
+        current_keys.add(key)
+        old = previous_by_key.get(key)
+        if old is None:
+            change_type = "new_holder" if match.holder != holder else "defence"
+            changes.append((match.start_time, change_type, match, None))
+        elif _result(old) != _result(match):
+            changes.append((match.start_time, "correction", match, old))
+        holder = match.holder
+
+    for key, old in previous_by_key.items():
+        if key not in current_keys:
+            changes.append((old.start_time, "removed", old, None))
+
+    changes.sort(key=lambda change: change[0])
+    return [
+        LinealCupChange(
+            sequence=last_sequence + idx,
+            type=change_type,
+            gender=gender,
+            match=match,
+            previous=old,
+        )
+        for idx, (_, change_type, match, old) in enumerate(changes, start=1)
+    ]
+
+
+def publish_changes(model: LinealCup) -> List[LinealCupChange]:
+    """Append the changes since the previous run to `data/{gender}_lineal_cup_changes.jsonl`.
+
+    The first run only records the state, it does not replay the whole history into the feed.
+    Changes are appended before the state is saved, so after a crash a run can re-emit changes with
+    the same sequence numbers; consumers should de-duplicate on `sequence`.
+    """
+    state = load_state(model.gender)
+    changes = []
+    if state is not None:
+        changes = diff(
+            state.title_matches,
+            model.title_matches,
+            model.gender,
+            state.last_sequence,
+        )
+
+    _append(model.gender, changes)
+
+    if state is None or changes:
+        last_sequence = changes[-1].sequence if changes else 0
+        output.write(
+            _state_path(model.gender),
+            LinealCupChangeFeedState(
+                last_sequence=last_sequence, title_matches=model.title_matches
+            ),
+        )
+    return changes
+
+
+def publish_title_match(
+    gender: str, match: LinealCupTitleMatch
+) -> Optional[LinealCupChange]:
+    """Append a single new title match, later than any before it, without a cup to diff.
+
+    Nothing is published before the first full run has recorded the state.
+    """
+    state = load_state(gender)
+    if state is None:
+        return None
+    previous = state.title_matches[-1].holder if state.title_matches else None
+    change = LinealCupChange(
+        sequence=state.last_sequence + 1,
+        type="new_holder" if match.holder != previous else "defence",
+        gender=gender,
+        match=match,
+    )
+    _append(gender, [change])
+    state.last_sequence = change.sequence
+    state.title_matches.append(match)
+    output.write(_state_path(gender), state)
+    return change
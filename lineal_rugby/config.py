@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 
 
@@ -6,3 +7,9 @@ class Config(BaseSettings):
 
     class Config:
         env_file = ".env"
+
+
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    """Resolve config on first use, so `load=False` runs never need `SPORT_RADAR_API_KEY`"""
+    return Config()
@@ -0,0 +1,288 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from . import instrument, output
+from .config import get_config
+from .models import (
+    Competition,
+    Competitions,
+    CrawlFailure,
+    CrawlReport,
+    Feed,
+    Season,
+    Seasons,
+    SeasonSummary,
+    SportRadarData,
+)
+
+SEVENS_BASE_URL = "https://api.sportradar.com/rugby-sevens/trial/v3/en"
+UNION_BASE_URL = "https://api.sportradar.com/rugby-union/trial/v3/en"
+
+SEVENS_FEED = Feed(name="sevens", base_url=SEVENS_BASE_URL)
+# 15s, as tracked by the Raeburn Shield. Nothing builds a cup from it yet and, with no
+# `competition_ids`, it is every club season too, so it is only crawled when asked for
+UNION_FEED = Feed(name="union", base_url=UNION_BASE_URL)
+
+# crawled by the app, every feed here shares the api key's rate limit
+FEEDS = [SEVENS_FEED]
+
+# every feed shares the api key, so requests across all feeds are spaced by this
+REQUEST_INTERVAL_SECONDS = 2
+
+# requests in flight across all feeds, the rate limiter is what bounds throughput
+MAX_WORKERS = 4
+
+# statuses worth retrying, anything else (e.g. 401, 404) fails straight away
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_CAP_SECONDS = 60
+
+# a checkpoint of a season that may still get results is only reused within the same crawl
+CHECKPOINT_MAX_AGE = timedelta(hours=12)
+
+# every match in a season with only these statuses is final, so its checkpoint never expires
+FINAL_STATUSES = {"closed", "ended", "cancelled", "abandoned"}
+
+CHECKPOINT_DIR = "checkpoints"
+
+
+class RateLimiter:
+    """Spaces calls at least `interval` seconds apart, across threads"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        time.sleep(slot - now)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key: str) -> RateLimiter:
+    """The rate limit is per api key, so is the limiter"""
+    with _rate_limiters_lock:
+        if api_key not in _rate_limiters:
+            _rate_limiters[api_key] = RateLimiter(REQUEST_INTERVAL_SECONDS)
+        return _rate_limiters[api_key]
+
+
+def _backoff_seconds(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after is not None and retry_after.isdigit():
+        return float(retry_after)
+    # "full jitter", spreads retries out rather than all clients retrying in lockstep
+    return random.uniform(
+        0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+    )
+
+
+def get_json(url: str, max_attempts: int = MAX_ATTEMPTS) -> dict:
+    """GET a sportradar endpoint, retrying rate limits, server errors and dropped connections"""
+    if max_attempts < 1:
+        raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+
+    # deferred, requests is only needed when hitting the api
+    import requests
+
+    api_key = get_config().SPORT_RADAR_API_KEY
+    rate_limiter = get_rate_limiter(api_key)
+
+    for attempt in range(max_attempts):
+        retry_after = None
+        try:
+            rate_limiter.wait()
+            instrument.count("http_calls")
+            response = requests.request("GET", url + f"?api_key={api_key}")
+            if response.status_code not in TRANSIENT_STATUS_CODES:
+                response.raise_for_status()
+                return response.json()
+            retry_after = response.headers.get("Retry-After")
+            error = requests.HTTPError(
+                f"{response.status_code} for {url}", response=response
+            )
+        except (requests.ConnectionError, requests.Timeout) as ex:
+            error = ex
+
+        if attempt + 1 < max_attempts:
+            wait = _backoff_seconds(attempt, retry_after)
+            print(f"Retrying {url} in {wait:.1f}s after: {error}")
+            instrument.count("http_retries")
+            time.sleep(wait)
+    raise error
+
+
+def feed_data_path(feed: str, filename: str) -> str:
+    """Each feed's caches and outputs live under `data/{feed}/`"""
+    return output.data_path(os.path.join(feed, filename))
+
+
+def _checkpoint_path(feed: Feed, season: Season) -> str:
+    filename = season.id.replace(":", "_") + ".json"
+    return feed_data_path(feed.name, os.path.join(CHECKPOINT_DIR, filename))
+
+
+def _is_final(season_summary: SeasonSummary) -> bool:
+    return all(
+        summary.sport_event_status.status in FINAL_STATUSES
+        for summary in season_summary.summaries
+    )
+
+
+def load_checkpoint(
+    feed: Feed, season: Season, now: datetime
+) -> Optional[SeasonSummary]:
+    """A previously crawled season, if it is final or was crawled recently enough to resume from"""
+    path = _checkpoint_path(feed, season)
+    try:
+        with open(path, "rb") as file:
+            season_summary = SeasonSummary.model_validate_json(file.read())
+    except FileNotFoundError:
+        return None
+
+    modified = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+    if _is_final(season_summary) or now - modified < CHECKPOINT_MAX_AGE:
+        return season_summary
+    return None
+
+
+def _crawl_season(
+    feed: Feed, season: Season, competition: Competition, now: datetime
+) -> Tuple[SeasonSummary, bool]:
+    """(season summary, whether it came from a checkpoint)"""
+    season_summary = load_checkpoint(feed, season, now)
+    if season_summary is not None:
+        instrument.count("checkpoint_hits")
+        return season_summary, True
+
+    print(f"Running season ({feed.name}):", season.name)
+    season_summary = SeasonSummary(
+        **get_json(f"{feed.base_url}/seasons/{season.id}/summaries.json")
+    )
+    season_summary.season = season
+    season_summary.competition = competition
+    output.write(_checkpoint_path(feed, season), season_summary)
+    return season_summary, False
+
+
+def crawl_seasons(
+    feed: Feed,
+    seasons: List[Season],
+    competitions: List[Competition],
+    executor: Executor,
+) -> Tuple[List[SeasonSummary], CrawlReport]:
+    """Fetch the summaries of every season, checkpointing each one to disk as it completes.
+
+    Seasons with a usable checkpoint are not fetched again, so a crawl that failed halfway can be
+    re-run at the cost of the seasons it did not finish. A season that still fails after retries is
+    recorded in the report and the crawl moves on to the next one.
+    """
+    now = datetime.now(timezone.utc)
+    competitions_by_id = {comp.id: comp for comp in competitions}
+    report = CrawlReport(started_at=now)
+
+    futures = []
+    for season in seasons:
+        competition = competitions_by_id.get(season.competition_id)
+        if competition is None:
+            report.failed.append(
+                CrawlFailure(
+                    season_id=season.id,
+                    name=season.name,
+                    error=f"Unknown competition {season.competition_id}",
+                )
+            )
+            continue
+        futures.append(
+            (season, executor.submit(_crawl_season, feed, season, competition, now))
+        )
+
+    season_summaries = []
+    for season, future in futures:
+        try:
+            season_summary, resumed = future.result()
+        except Exception as ex:
+            report.failed.append(
+                CrawlFailure(season_id=season.id, name=season.name, error=str(ex))
+            )
+            continue
+        if resumed:
+            report.resumed += 1
+        else:
+            report.fetched += 1
+        season_summaries.append(season_summary)
+
+    report.finished_at = datetime.now(timezone.utc)
+    return season_summaries, report
+
+
+def crawl_feed(feed: Feed, executor: Executor) -> Tuple[SportRadarData, CrawlReport]:
+    """Crawl one feed into `data/{feed}/sportradar_data.json`, with its report alongside"""
+    competitions = Competitions(
+        **get_json(f"{feed.base_url}/competitions.json")
+    ).competitions
+    seasons = Seasons(**get_json(f"{feed.base_url}/seasons.json")).seasons
+    if feed.competition_ids is not None:
+        seasons = [s for s in seasons if s.competition_id in feed.competition_ids]
+
+    season_summaries, report = crawl_seasons(feed, seasons, competitions, executor)
+    output.write(feed_data_path(feed.name, "crawl_report.json"), report)
+
+    data = SportRadarData(feed=feed.name, season_summaries=season_summaries)
+    if not report.failed:
+        output.write(feed_data_path(feed.name, "sportradar_data.json"), data)
+    return data, report
+
+
+def crawl_feeds(
+    feeds: List[Feed] = FEEDS, max_workers: int = MAX_WORKERS
+) -> Dict[str, Tuple[SportRadarData, CrawlReport]]:
+    """Crawl several feeds concurrently, sharing one pool of workers and the per-key rate limit.
+
+    Season requests from every feed interleave, so adding a feed adds its requests to the queue
+    rather than a whole sequential crawl's worth of latency and sleeps. A feed that fails outright,
+    e.g. its competitions or seasons cannot be fetched, gets an empty result and a report with
+    the `error`, and the other feeds carry on.
+
+    Returns:
+        Dict[str, Tuple[SportRadarData, CrawlReport]]: keyed by feed name
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as season_executor:
+        with ThreadPoolExecutor(max_workers=len(feeds)) as feed_executor:
+            futures = {
+                feed.name: feed_executor.submit(crawl_feed, feed, season_executor)
+                for feed in feeds
+            }
+            results = {}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as ex:
+                    # e.g. a key without access to the feed, it must not lose the other feeds
+                    now = datetime.now(timezone.utc)
+                    report = CrawlReport(started_at=now, finished_at=now, error=str(ex))
+                    output.write(feed_data_path(name, "crawl_report.json"), report)
+                    results[name] = (SportRadarData(feed=name), report)
+            return results
+
+
+def load_feed_data(feed: str) -> SportRadarData:
+    """The last crawl of a feed, from `data/{feed}/sportradar_data.json`"""
+    path = feed_data_path(feed, "sportradar_data.json")
+    if feed == SEVENS_FEED.name and not os.path.exists(path):
+        # crawls from before feeds were namespaced
+        path = output.data_path("sportradar_data.json")
+    # parsed and validated in one pass by pydantic-core, no intermediate dicts
+    with open(path, "rb") as file:
+        return SportRadarData.model_validate_json(file.read())
@@ -0,0 +1,94 @@
+import os
+from typing import Callable, Optional, Tuple
+from . import instrument, output
+from .crawler import SEVENS_BASE_URL, get_json
+from .models import LinealCup, LinealCupTitleMatch, Summary
+
+DETAILS_DIR = "match_details"
+
+
+def scores(summary: Summary, winner_id: str) -> Tuple[Optional[int], Optional[int]]:
+    """(winner score, loser score) from a summary, None if the status carries no scores"""
+    status = summary.sport_event_status
+    if status.home_score is None or status.away_score is None:
+        return None, None
+
+    competitors = summary.sport_event.competitors
+    home = next((c for c in competitors if c.qualifier == "home"), competitors[0])
+    if winner_id == home.id:
+        return status.home_score, status.away_score
+    return status.away_score, status.home_score
+
+
+def _detail_path(sport_event_id: str) -> str:
+    filename = sport_event_id.replace(":", "_") + ".json"
+    return output.data_path(os.path.join(DETAILS_DIR, filename))
+
+
+def load_detail(sport_event_id: str) -> Optional[Summary]:
+    try:
+        with open(_detail_path(sport_event_id), "rb") as file:
+            return Summary.model_validate_json(file.read())
+    except FileNotFoundError:
+        return None
+
+
+def fetch_detail(
+    sport_event_id: str,
+    base_url: str = SEVENS_BASE_URL,
+    fetch_json: Callable[[str], dict] = get_json,
+) -> Summary:
+    """Fetch a match from the sport_event_summary endpoint, caching it forever once it has ended"""
+    detail = Summary(
+        **fetch_json(f"{base_url}/sport_events/{sport_event_id}/summary.json")
+    )
+    if detail.sport_event_status.match_status == "ended":
+        output.write(_detail_path(sport_event_id), detail)
+    return detail
+
+
+def _augment_title_match(match: LinealCupTitleMatch, fetch: bool) -> None:
+    if match.winner_score is None and match.sport_event_id is not None:
+        detail = load_detail(match.sport_event_id)
+        if detail is not None:
+            instrument.count("detail_cache_hits")
+        elif fetch:
+            # deferred like in `get_json`, requests is only needed when hitting the api
+            import requests
+
+            try:
+                detail = fetch_detail(match.sport_event_id)
+            except (requests.RequestException, ValueError) as ex:
+                # pydantic's ValidationError is a ValueError too, the scores stay unknown
+                print(f"Failed to fetch the details of {match.sport_event_id}: {ex}")
+                instrument.count("detail_fetch_failures")
+        if detail is not None:
+            winner_id = next(
+                (
+                    c.id
+                    for c in detail.sport_event.competitors
+                    if c.name == match.winner_name
+                ),
+                None,
+            )
+            if winner_id is not None:
+                match.winner_score, match.loser_score = scores(detail, winner_id)
+
+    if match.winner_score is not None and match.loser_score is not None:
+        match.margin = match.winner_score - match.loser_score
+
+
+def augment_title_match_details(model: LinealCup, fetch: bool = False) -> None:
+    """Add scores and winning margins to the title matches.
+
+    Season summaries usually carry the scores already. Only title matches without them fall back
+    to the per-match endpoint, so this costs at most a few calls per tournament, and none once the
+    details are cached (ended matches never change). A match whose details fail to fetch or
+    validate is logged and left without scores.
+
+    Args:
+        model (LinealCup): cup with `title_matches` from `augment_cup_holders`
+        fetch (bool, optional): call the api for uncached details, otherwise use the cache only. Defaults to False.
+    """
+    for match in model.title_matches:
+        _augment_title_match(match, fetch)
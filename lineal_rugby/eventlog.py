@@ -0,0 +1,474 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+from . import instrument, output
+from .models import LinealCup, LinealCupEvent
+
+EVENTLOG_DIR = "eventlog"
+
+EVENTS_FILENAME = "events.bin"
+STRINGS_FILENAME = "strings.bin"
+INDEX_FILENAME = "index.bin"
+
+# magic, version, record size, generation. The generation changes whenever the log is rewritten
+# rather than appended to, so an index built for an older log is never trusted
+HEADER = struct.Struct("<8sHH4xQ8x")
+MAGIC = b"LCEVTLOG"
+VERSION = 1
+
+# start time (microseconds since the epoch, utc), sport event, winner, loser and competition
+# string ids, winner and loser scores, flags
+RECORD = struct.Struct("<qQIIIhhB7x")
+
+INDEX_HEADER = struct.Struct("<8sQI4x")
+INDEX_MAGIC = b"LCEVTIDX"
+
+# the index holds the start time of every INDEX_STRIDE-th record, 256 records are 2 pages
+INDEX_STRIDE = 256
+
+STRING_LENGTH = struct.Struct("<H")
+
+NO_SCORE = -1
+FLAG_TIE = 1
+FLAG_SPORT_EVENT_STRING = (
+    2  # the sport event is a string id rather than a sportradar number
+)
+
+# sport event ids are stored as their number, they would otherwise be most of the string table
+SPORT_EVENT_PREFIX = "sr:sport_event:"
+NO_SPORT_EVENT = 0  # e.g. imported history
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class EventRecord(NamedTuple):
+    """A raw event record, names are ids into the log's string table"""
+
+    start_us: int
+    sport_event: int
+    winner_id: int
+    loser_id: int
+    competition_id: int
+    winner_score: int
+    loser_score: int
+    flags: int
+
+    @property
+    def is_tie(self) -> bool:
+        return bool(self.flags & FLAG_TIE)
+
+
+def log_dir(gender: str) -> str:
+    return output.data_path(os.path.join(EVENTLOG_DIR, gender))
+
+
+def to_us(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_us(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _read_strings(path: str) -> List[str]:
+    """Every complete entry of a string table, a torn entry at the end is ignored"""
+    try:
+        with open(path, "rb") as file:
+            content = file.read()
+    except FileNotFoundError:
+        return []
+    strings, offset = [], 0
+    while offset + STRING_LENGTH.size <= len(content):
+        (length,) = STRING_LENGTH.unpack_from(content, offset)
+        end = offset + STRING_LENGTH.size + length
+        if end > len(content):
+            break
+        strings.append(content[offset + STRING_LENGTH.size : end].decode("utf-8"))
+        offset = end
+    return strings
+
+
+class _StringTable:
+    """Append-only, ids are never reassigned, so records stay valid across appends and rewrites"""
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, STRINGS_FILENAME)
+        self.strings = _read_strings(self.path)
+        self.ids = {s: i for i, s in enumerate(self.strings)}
+        self._pending: List[str] = []
+
+    def id(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+            self._pending.append(value)
+        return string_id
+
+    def flush(self) -> None:
+        """Append new strings, before any record that refers to them"""
+        if not self._pending:
+            return
+        complete = sum(
+            STRING_LENGTH.size + len(s.encode("utf-8"))
+            for s in self.strings[: len(self.strings) - len(self._pending)]
+        )
+        with open(self.path, "ab") as file:
+            # drop a torn entry from an interrupted append, it was never referenced
+            file.truncate(complete)
+            for value in self._pending:
+                encoded = value.encode("utf-8")
+                file.write(STRING_LENGTH.pack(len(encoded)) + encoded)
+        self._pending = []
+
+
+def _sport_event_number(sport_event_id: str) -> Optional[int]:
+    number = sport_event_id.removeprefix(SPORT_EVENT_PREFIX)
+    return int(number) if number.isdigit() else None
+
+
+def _pack(event: LinealCupEvent, strings: _StringTable) -> bytes:
+    flags = FLAG_TIE if event.is_tie else 0
+    sport_event_id = event.sport_event_id
+    if sport_event_id is None:
+        sport_event = NO_SPORT_EVENT
+    elif (number := _sport_event_number(sport_event_id)) is not None:
+        sport_event = number
+    else:
+        sport_event = strings.id(sport_event_id)
+        flags |= FLAG_SPORT_EVENT_STRING
+    return RECORD.pack(
+        to_us(event.start_time),
+        sport_event,
+        strings.id(event.winner_name),
+        strings.id(event.loser_name),
+        strings.id(event.competition_name),
+        NO_SCORE if event.winner_score is None else event.winner_score,
+        NO_SCORE if event.loser_score is None else event.loser_score,
+        flags,
+    )
+
+
+class _Times(Sequence):
+    """Start times of the records, read from the mapped file on access for `bisect`"""
+
+    def __init__(self, log: "EventLog"):
+        self._log = log
+
+    def __len__(self) -> int:
+        return len(self._log)
+
+    def __getitem__(self, idx: int) -> int:
+        return self._log.time_at(idx)
+
+
+class EventLog:
+    """Read side of a cup's event log, memory mapped so nothing is deserialized up front.
+
+    `events.bin` is a header then fixed-width records in time order, `strings.bin` the team and
+    competition names the records refer to by id, and `index.bin` the start time of every
+    `INDEX_STRIDE`-th record so a time lookup only touches a couple of pages. Processes reading the
+    same log share the page cache, and a reader keeps its mapping of a rewritten log until
+    `refresh`.
+
+    Example:
+        with EventLog(log_dir("men")) as log:
+            for record in log.records(log.bisect(since)):
+                ...
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._count = 0
+        self.generation = None
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._index = array("q")
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Pick up records appended, or a rewrite, since the log was opened"""
+        path = os.path.join(self.directory, EVENTS_FILENAME)
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            self.close()
+            return
+        size = os.fstat(file.fileno()).st_size
+        if size < HEADER.size:
+            file.close()
+            self.close()
+            return
+        self.close()
+        self._file = file
+        self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, generation = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"Not a version {VERSION} event log: {path}")
+        self.generation = generation
+        # a torn record at the end, from an interrupted append, is not counted
+        self._count = (size - HEADER.size) // RECORD.size
+        self._load_strings()
+        self._index = self._load_index()
+
+    def _load_strings(self) -> None:
+        self._strings = _read_strings(os.path.join(self.directory, STRINGS_FILENAME))
+        self._string_ids = {s: i for i, s in enumerate(self._strings)}
+
+    def _load_index(self) -> array:
+        index = array("q")
+        try:
+            with open(os.path.join(self.directory, INDEX_FILENAME), "rb") as file:
+                content = file.read()
+            magic, generation, stride = INDEX_HEADER.unpack_from(content, 0)
+            if (
+                magic == INDEX_MAGIC
+                and generation == self.generation
+                and stride == INDEX_STRIDE
+            ):
+                index.frombytes(content[INDEX_HEADER.size :])
+        except (FileNotFoundError, struct.error):
+            pass
+        # the index can trail the records (or be missing), fill in the rest from the log itself
+        expected = -(-self._count // INDEX_STRIDE)
+        del index[expected:]
+        for idx in range(len(index) * INDEX_STRIDE, self._count, INDEX_STRIDE):
+            index.append(self.time_at(idx))
+        return index
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = self._file = None
+        self._count = 0
+        self.generation = None
+
+    def __enter__(self) -> "EventLog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def time_at(self, idx: int) -> int:
+        """Start time of a record in microseconds, without unpacking the rest of it"""
+        return struct.unpack_from("<q", self._map, HEADER.size + idx * RECORD.size)[0]
+
+    def record(self, idx: int) -> EventRecord:
+        if not 0 <= idx < self._count:
+            raise IndexError(idx)
+        return EventRecord._make(
+            RECORD.unpack_from(self._map, HEADER.size + idx * RECORD.size)
+        )
+
+    def records(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[EventRecord]:
+        """Raw records in time order, unpacked straight from the mapped pages"""
+        stop = self._count if stop is None else min(stop, self._count)
+        if start >= stop:
+            return
+        view = memoryview(self._map)[
+            HEADER.size + start * RECORD.size : HEADER.size + stop * RECORD.size
+        ]
+        try:
+            yield from map(EventRecord._make, RECORD.iter_unpack(view))
+        finally:
+            view.release()
+
+    def bisect(self, start_time: datetime) -> int:
+        """Index of the first record at or after `start_time`, `len(log)` if there is none"""
+        target = to_us(start_time)
+        block = bisect_left(self._index, target)
+        lo = max(0, (block - 1) * INDEX_STRIDE)
+        hi = min(self._count, block * INDEX_STRIDE)
+        return bisect_left(_Times(self), target, lo, hi)
+
+    def name(self, string_id: int) -> str:
+        if string_id >= len(self._strings):
+            # appended by a writer after we loaded the table
+            self._load_strings()
+        return self._strings[string_id]
+
+    def sport_event_id(self, record: EventRecord) -> Optional[str]:
+        if record.flags & FLAG_SPORT_EVENT_STRING:
+            return self.name(record.sport_event)
+        if record.sport_event == NO_SPORT_EVENT:
+            return None
+        return f"{SPORT_EVENT_PREFIX}{record.sport_event}"
+
+    def string_id(self, name: str) -> Optional[int]:
+        """Id of a team or competition name, to compare against records without decoding them"""
+        return self._string_ids.get(name)
+
+    def find(self, sport_event_id: str) -> Optional[int]:
+        """Index of the record of a sport event, a scan of the raw records with no decoding"""
+        number = _sport_event_number(sport_event_id)
+        is_string = number is None
+        if is_string:
+            number = self.string_id(sport_event_id)
+            if number is None:
+                return None
+        for idx, record in enumerate(self.records()):
+            if record.sport_event == number and is_string == bool(
+                record.flags & FLAG_SPORT_EVENT_STRING
+            ):
+                return idx
+        return None
+
+    def to_event(self, record: EventRecord, gender: str) -> LinealCupEvent:
+        return LinealCupEvent(
+            start_time=from_us(record.start_us),
+            winner_name=self.name(record.winner_id),
+            loser_name=self.name(record.loser_id),
+            is_tie=record.is_tie,
+            gender=gender,
+            competition_name=self.name(record.competition_id),
+            sport_event_id=self.sport_event_id(record),
+            winner_score=(
+                None if record.winner_score == NO_SCORE else record.winner_score
+            ),
+            loser_score=None if record.loser_score == NO_SCORE else record.loser_score,
+        )
+
+    def events(
+        self,
+        gender: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> Iterator[LinealCupEvent]:
+        """Events in [start_time, end_time), decoded one at a time"""
+        start = 0 if start_time is None else self.bisect(start_time)
+        stop = None if end_time is None else self.bisect(end_time)
+        for record in self.records(start, stop):
+            yield self.to_event(record, gender)
+
+
+def _new_generation() -> int:
+    return int.from_bytes(os.urandom(8), "little")
+
+
+def _times(packed: bytes, step: int = 1) -> List[int]:
+    """Start times of every `step`-th packed record"""
+    return [
+        struct.unpack_from("<q", packed, idx * RECORD.size)[0]
+        for idx in range(0, len(packed) // RECORD.size, step)
+    ]
+
+
+def _write_index(directory: str, generation: int, times: Sequence[int]) -> None:
+    output.write(
+        os.path.join(directory, INDEX_FILENAME),
+        INDEX_HEADER.pack(INDEX_MAGIC, generation, INDEX_STRIDE)
+        + array("q", times).tobytes(),
+    )
+
+
+def _rewrite(directory: str, packed: bytes) -> None:
+    """Replace the records under a new generation, readers keep their mapping of the old file"""
+    generation = _new_generation()
+    output.write(
+        os.path.join(directory, EVENTS_FILENAME),
+        HEADER.pack(MAGIC, VERSION, RECORD.size, generation) + packed,
+    )
+    _write_index(directory, generation, _times(packed, INDEX_STRIDE))
+
+
+def _append_records(log: EventLog, packed: bytes) -> None:
+    with open(os.path.join(log.directory, EVENTS_FILENAME), "ab") as file:
+        # drop a torn record from an interrupted append
+        file.truncate(HEADER.size + len(log) * RECORD.size)
+        file.write(packed)
+
+    # index entries for the strided positions that fall in the appended records
+    first = len(log._index) * INDEX_STRIDE - len(log)
+    index = list(log._index) + _times(packed[first * RECORD.size :], INDEX_STRIDE)
+    _write_index(log.directory, log.generation, index)
+
+
+def append(directory: str, events: List[LinealCupEvent]) -> int:
+    """Append events, in time order and no earlier than the last one logged.
+
+    New names are appended to the string table first and the records after, so a reader never
+    sees a record whose names it cannot resolve.
+
+    Returns:
+        int: number of records appended
+    """
+    if not events:
+        return 0
+    os.makedirs(directory, exist_ok=True)
+    strings = _StringTable(directory)
+    packed = b"".join(_pack(event, strings) for event in events)
+    times = _times(packed)
+
+    with EventLog(directory) as log:
+        if times != sorted(times) or (
+            len(log) and times[0] < log.time_at(len(log) - 1)
+        ):
+            raise ValueError("Events must be appended in time order")
+        strings.flush()
+        if log.generation is None:
+            _rewrite(directory, packed)
+        else:
+            _append_records(log, packed)
+    instrument.count("events_appended", len(events))
+    return len(events)
+
+
+def sync(model: LinealCup) -> int:
+    """Bring `data/eventlog/{gender}/` in line with a cup's (time ordered) events.
+
+    When the log is a prefix of the events, which is the usual case of new results, only the new
+    records are appended. Anything else, e.g. a corrected or newly imported older result, rewrites
+    the records atomically under a new generation. The string table is only ever appended to.
+
+    Returns:
+        int: number of records appended or rewritten
+    """
+    directory = log_dir(model.gender)
+    os.makedirs(directory, exist_ok=True)
+    strings = _StringTable(directory)
+    packed = b"".join(_pack(event, strings) for event in model.events)
+    strings.flush()
+
+    with EventLog(directory) as log:
+        logged = len(log) * RECORD.size
+        if log.generation is not None and logged <= len(packed):
+            view = memoryview(log._map)[HEADER.size : HEADER.size + logged]
+            is_prefix = view == memoryview(packed)[:logged]
+            view.release()
+            if is_prefix:
+                appended = (len(packed) - logged) // RECORD.size
+                if appended:
+                    _append_records(log, packed[logged:])
+                    instrument.count("events_appended", appended)
+                return appended
+
+    _rewrite(directory, packed)
+    instrument.count("events_rewritten", len(model.events))
+    return len(model.events)
+
+
+if __name__ == "__main__":
+    # python -m lineal_rugby.eventlog men
+    with EventLog(log_dir(sys.argv[1])) as log:
+        if len(log):
+            first, last = log.record(0), log.record(len(log) - 1)
+            print(
+                f"{len(log)} events from {from_us(first.start_us)} to {from_us(last.start_us)}"
+            )
+        else:
+            print("No events logged")
@@ -0,0 +1,210 @@
+import csv
+import heapq
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+from . import output
+from .models import LinealCupEvent
+
+HISTORY_DIR = "history"
+
+# rows held in memory at once, while reading and while sorting
+CHUNK_SIZE = 50_000
+
+# alternative spellings seen in historic sources -> the sportradar competitor name
+DEFAULT_ALIASES = {
+    "united states": "USA",
+    "united states of america": "USA",
+    "us": "USA",
+    "western samoa": "Samoa",
+    "rsa": "South Africa",
+    "nz": "New Zealand",
+    "aotearoa": "New Zealand",
+    "republic of ireland": "Ireland",
+    "gb": "Great Britain",
+    "team gb": "Great Britain",
+    "hong kong china": "Hong Kong",
+}
+
+
+def _alias_key(name: str) -> str:
+    return " ".join(name.casefold().replace(".", "").split())
+
+
+class AliasIndex:
+    """Normalizes team names from historic sources to the names used in the sportradar data.
+
+    Only spellings are merged: Great Britain and the home nations stay separate teams, as they
+    were separate sides on the pitch.
+    """
+
+    def __init__(self, aliases: Optional[Dict[str, str]] = None):
+        self._index = {
+            _alias_key(k): v for k, v in (aliases or DEFAULT_ALIASES).items()
+        }
+
+    @classmethod
+    def from_csv(cls, path: str) -> "AliasIndex":
+        """Defaults plus an `alias,name` csv file"""
+        aliases = dict(DEFAULT_ALIASES)
+        with open(path, "r", newline="") as file:
+            for row in csv.DictReader(file):
+                aliases[row["alias"]] = row["name"]
+        return cls(aliases)
+
+    def resolve(self, name: str) -> str:
+        name = name.strip()
+        return self._index.get(_alias_key(name), name)
+
+
+def _parse_time(value: str) -> datetime:
+    start_time = datetime.fromisoformat(value.strip())
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    return start_time
+
+
+def _to_event(row: dict, aliases: AliasIndex) -> LinealCupEvent:
+    """A result row with `start_time, team_a, team_b, gender` and either `score_a, score_b` or `winner`.
+
+    An empty `winner` (or equal scores) is a tie. `competition_name` is optional. Raises
+    ValueError for a `winner` that is neither team once aliases are resolved.
+    """
+    team_a = aliases.resolve(row["team_a"])
+    team_b = aliases.resolve(row["team_b"])
+    score_a, score_b = row.get("score_a"), row.get("score_b")
+
+    if score_a not in (None, "") and score_b not in (None, ""):
+        score_a, score_b = int(score_a), int(score_b)
+        winner = team_a if score_a >= score_b else team_b
+        is_tie = score_a == score_b
+        winner_score, loser_score = max(score_a, score_b), min(score_a, score_b)
+    else:
+        winner = aliases.resolve(row.get("winner") or "") or team_a
+        is_tie = not row.get("winner")
+        winner_score = loser_score = None
+        if winner not in (team_a, team_b):
+            raise ValueError(
+                f"winner {row['winner']!r} is neither {team_a} nor {team_b}"
+            )
+
+    return LinealCupEvent(
+        start_time=_parse_time(row["start_time"]),
+        winner_name=winner,
+        loser_name=team_b if winner == team_a else team_a,
+        is_tie=is_tie,
+        gender=row["gender"].strip().lower(),
+        competition_name=row.get("competition_name") or "Historic",
+        winner_score=winner_score,
+        loser_score=loser_score,
+    )
+
+
+def _read_rows(path: str) -> Iterator[dict]:
+    with open(path, "r", newline="") as file:
+        if path.endswith(".jsonl"):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(file)
+
+
+def read_results(
+    path: str, aliases: Optional[AliasIndex] = None, chunk_size: int = CHUNK_SIZE
+) -> Iterator[List[LinealCupEvent]]:
+    """Stream a csv or json lines results file as chunks of normalized events, skipping bad rows"""
+    aliases = aliases or AliasIndex()
+    chunk, skipped = [], 0
+    for line_number, row in enumerate(_read_rows(path), start=1):
+        try:
+            chunk.append(_to_event(row, aliases))
+        except (KeyError, ValueError, TypeError) as ex:
+            skipped += 1
+            if skipped <= 10:
+                print(f"Skipping {path} row {line_number}: {ex}")
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+    if skipped:
+        print(f"Skipped {skipped} invalid row(s) in {path}")
+
+
+def history_path(gender: str) -> str:
+    return output.data_path(os.path.join(HISTORY_DIR, f"{gender}_events.jsonl"))
+
+
+def _write_run(directory: str, events: List[LinealCupEvent]) -> str:
+    events.sort(key=lambda event: event.start_time)
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".jsonl")
+    with os.fdopen(fd, "w") as file:
+        file.writelines(event.model_dump_json() + "\n" for event in events)
+    return path
+
+
+def _read_run(path: str) -> Iterator[LinealCupEvent]:
+    with open(path, "r") as file:
+        for line in file:
+            yield LinealCupEvent.model_validate_json(line)
+
+
+def import_history(
+    paths: Iterable[str],
+    aliases: Optional[AliasIndex] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[str, int]:
+    """Import historic result files into time-ordered `data/history/{gender}_events.jsonl` files.
+
+    Uses an external merge sort: each chunk is sorted and spilled to a temporary run file, then
+    the runs are merged as streams, so memory is bounded by `chunk_size` whatever the input size.
+
+    Returns:
+        Dict[str, int]: number of events written per gender
+    """
+    os.makedirs(output.data_path(HISTORY_DIR), exist_ok=True)
+    counts = {}
+    with tempfile.TemporaryDirectory(dir=output.data_path(HISTORY_DIR)) as tmp_dir:
+        runs: Dict[str, List[str]] = {}
+        for path in paths:
+            for chunk in read_results(path, aliases, chunk_size):
+                by_gender: Dict[str, List[LinealCupEvent]] = {}
+                for event in chunk:
+                    by_gender.setdefault(event.gender, []).append(event)
+                for gender, events in by_gender.items():
+                    runs.setdefault(gender, []).append(_write_run(tmp_dir, events))
+
+        for gender, run_paths in runs.items():
+            merged = heapq.merge(
+                *[_read_run(p) for p in run_paths], key=lambda e: e.start_time
+            )
+            fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".jsonl")
+            counts[gender] = 0
+            with os.fdopen(fd, "w") as file:
+                for event in merged:
+                    file.write(event.model_dump_json() + "\n")
+                    counts[gender] += 1
+            os.replace(tmp_path, history_path(gender))
+    return counts
+
+
+def iter_history(
+    gender: str, before: Optional[datetime] = None
+) -> Iterator[LinealCupEvent]:
+    """Stream the imported history of a cup in time order, optionally only events before a time"""
+    try:
+        for event in _read_run(history_path(gender)):
+            if before is not None and event.start_time >= before:
+                return
+            yield event
+    except FileNotFoundError:
+        return
+
+
+if __name__ == "__main__":
+    # python -m lineal_rugby.history results.csv [more_results.jsonl ...]
+    print(import_history(sys.argv[1:]))
@@ -0,0 +1,266 @@
+import abc
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from . import eventlog, instrument, output
+from .models import (
+    LinealCupEvent,
+    LinealCupHolderState,
+    LinealCupReign,
+    LinealCupStatistics,
+    LinealCupTitleMatch,
+    LinealCupWinsByCountry,
+    LinearCupHolder,
+)
+
+HOLDERS_FILENAME = "holders.bin"
+HOLDERS_MAGIC = b"LCHOLDER"
+
+# start time (microseconds since the epoch, utc), holder string id in the event log's table
+HOLDER_RECORD = struct.Struct("<qI4x")
+
+
+def _to_title_match(event: LinealCupEvent, holder: str) -> LinealCupTitleMatch:
+    return LinealCupTitleMatch(
+        start_time=event.start_time,
+        holder=holder,
+        winner_name=event.winner_name,
+        loser_name=event.loser_name,
+        is_tie=event.is_tie,
+        competition_name=event.competition_name,
+        sport_event_id=event.sport_event_id,
+        winner_score=event.winner_score,
+        loser_score=event.loser_score,
+    )
+
+
+def iter_title_matches(
+    events: Iterable[LinealCupEvent], current_holder: Optional[str] = None
+) -> Iterator[LinealCupTitleMatch]:
+    """The holder engine: title matches, with the holder after each, from time ordered events.
+
+    Only the current holder is kept between events, so any length of history streams through
+    in constant memory, and events after the last one seen can carry on from `current_holder`.
+    """
+    for event in events:
+        if current_holder is None and event.is_tie:
+            # first event is a tie, no holder yet
+            continue
+
+        if current_holder is None:
+            # first event
+            current_holder = event.winner_name
+
+        elif event.winner_name == current_holder or event.loser_name == current_holder:
+            if not event.is_tie:
+                current_holder = event.winner_name
+            # else current_holder remains the same, a tie still counts as a defence
+
+        else:
+            # ignore any game *not* involving the current holder
+            continue
+
+        yield _to_title_match(event, current_holder)
+
+
+def update_reigns(
+    reigns: List[LinealCupReign], entry: Union[LinearCupHolder, LinealCupTitleMatch]
+) -> None:
+    """Add a holder entry, or title match, to the reigns before it"""
+    if reigns and reigns[-1].holder == entry.holder:
+        reigns[-1].matches += 1
+        return
+    if reigns:
+        reigns[-1].end_time = entry.start_time
+    reigns.append(
+        LinealCupReign(holder=entry.holder, start_time=entry.start_time, matches=1)
+    )
+
+
+class HolderStats:
+    """Current holder and title matches per holder, updated one title match at a time"""
+
+    def __init__(self):
+        self.current_holder: Optional[str] = None
+        self.matches = 0
+        self._wins: Counter = Counter()
+
+    @classmethod
+    def from_reigns(cls, reigns: List[LinealCupReign]) -> "HolderStats":
+        """The same counts, and order of first reigns, as updating with every title match"""
+        stats = cls()
+        for reign in reigns:
+            stats.current_holder = reign.holder
+            stats.matches += reign.matches
+            stats._wins[reign.holder] += reign.matches
+        return stats
+
+    def update(self, holder: str) -> None:
+        self.current_holder = holder
+        self.matches += 1
+        self._wins[holder] += 1
+
+    def statistics(self) -> LinealCupStatistics:
+        # stable sort, so teams with the same count stay in the order they first held the title
+        wins = sorted(self._wins.items(), key=lambda x: x[1], reverse=True)
+        return LinealCupStatistics(
+            currentHolder=self.current_holder,
+            winsByCountry=[LinealCupWinsByCountry(country=k, wins=v) for k, v in wins],
+        )
+
+
+class _AtomicSink(abc.ABC):
+    """Streams to a temp file, renamed over `path` on close unless the content is unchanged"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        self._file = os.fdopen(fd, "wb")
+        self._digest = hashlib.sha256()
+
+    def _write(self, content: bytes) -> None:
+        self._file.write(content)
+        self._digest.update(content)
+
+    @abc.abstractmethod
+    def write(self, match: LinealCupTitleMatch) -> None:
+        """Add a holder entry for the title match"""
+
+    def close(self) -> None:
+        self._file.close()
+        if output._file_digest(self.path) == self._digest.hexdigest():
+            os.remove(self._tmp_path)
+            instrument.count("files_unchanged")
+            return
+        os.chmod(self._tmp_path, 0o644)
+        os.replace(self._tmp_path, self.path)
+        instrument.count("files_written")
+
+    def abort(self) -> None:
+        self._file.close()
+        os.remove(self._tmp_path)
+
+
+def _holder_line(match: LinealCupTitleMatch) -> bytes:
+    entry = LinearCupHolder(start_time=match.start_time, holder=match.holder)
+    return entry.model_dump_json().encode("utf-8") + b"\n"
+
+
+class JsonLinesSink(_AtomicSink):
+    """One `LinearCupHolder` json object per line"""
+
+    def write(self, match: LinealCupTitleMatch) -> None:
+        self._write(_holder_line(match))
+
+
+def _holder_record(match: LinealCupTitleMatch, string_ids: Dict[str, int]) -> bytes:
+    return HOLDER_RECORD.pack(
+        eventlog.to_us(match.start_time), string_ids[match.holder]
+    )
+
+
+class BinarySink(_AtomicSink):
+    """Fixed-width holder records next to a cup's event log, names from its string table.
+
+    Every holder is a team in the log, so their names are already in the table. The header is the
+    event log's, with the generation of the records the holders were computed from.
+    """
+
+    def __init__(self, directory: str, generation: int):
+        super().__init__(os.path.join(directory, HOLDERS_FILENAME))
+        self._string_ids = eventlog._StringTable(directory).ids
+        self._write(
+            eventlog.HEADER.pack(
+                HOLDERS_MAGIC, eventlog.VERSION, HOLDER_RECORD.size, generation
+            )
+        )
+
+    def write(self, match: LinealCupTitleMatch) -> None:
+        self._write(_holder_record(match, self._string_ids))
+
+
+def stream_holders(
+    events: Iterable[LinealCupEvent], sinks: List[_AtomicSink]
+) -> HolderStats:
+    """Run the holder engine over `events`, writing each holder entry to every sink as it goes.
+
+    Nothing but the current holder and the per-holder counts is held, so peak memory does not
+    grow with the length of the history. The sinks are closed (or aborted on error) here.
+    """
+    stats = HolderStats()
+    try:
+        for match in iter_title_matches(events):
+            for sink in sinks:
+                sink.write(match)
+            stats.update(match.holder)
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+    for sink in sinks:
+        sink.close()
+    return stats
+
+
+def holders_path(gender: str) -> str:
+    return output.data_path(f"{gender}_lineal_cup_holders.jsonl")
+
+
+def append_holder(gender: str, match: LinealCupTitleMatch) -> None:
+    """Append the holder entry of a title match later than any before it, to the files the sinks wrote.
+
+    `holders.bin` is only there if `stream_from_log` wrote it, and stays valid for the log's
+    generation since the match's event was appended to the log first.
+    """
+    with open(holders_path(gender), "ab") as file:
+        file.write(_holder_line(match))
+    directory = eventlog.log_dir(gender)
+    path = os.path.join(directory, HOLDERS_FILENAME)
+    if os.path.exists(path):
+        with open(path, "ab") as file:
+            file.write(_holder_record(match, eventlog._StringTable(directory).ids))
+
+
+def state_path(gender: str) -> str:
+    return output.data_path(f"{gender}_lineal_cup_holder_state.json")
+
+
+def load_state(gender: str) -> Optional[LinealCupHolderState]:
+    try:
+        with open(state_path(gender), "rb") as file:
+            return LinealCupHolderState.model_validate_json(file.read())
+    except FileNotFoundError:
+        return None
+
+
+def stream_from_log(gender: str) -> HolderStats:
+    """Holders and stats of a cup straight from its event log, decoding one event at a time.
+
+    Writes `data/{gender}_lineal_cup_holders.jsonl`, `data/eventlog/{gender}/holders.bin` and
+    `data/{gender}_lineal_cup_stats.json`.
+    """
+    directory = eventlog.log_dir(gender)
+    with eventlog.EventLog(directory) as log:
+        if log.generation is None:
+            raise FileNotFoundError(f"No event log in {directory}")
+        sinks = [
+            JsonLinesSink(holders_path(gender)),
+            BinarySink(directory, log.generation),
+        ]
+        stats = stream_holders(log.events(gender), sinks)
+    output.write(
+        output.data_path(f"{gender}_lineal_cup_stats.json"), stats.statistics()
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    # python -m lineal_rugby.holders men
+    stats = stream_from_log(sys.argv[1])
+    print(f"{stats.matches} title matches, current holder {stats.current_holder}")
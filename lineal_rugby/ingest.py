@@ -0,0 +1,298 @@
+import argparse
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from . import app, changefeed, details, eventlog, holders, output, pages, shards
+from .models import (
+    EventFilter,
+    LinealCup,
+    LinealCupEvent,
+    LinealCupHolderState,
+    LinealCupIngestResult,
+    Summary,
+)
+
+GENDERS = ("men", "women")
+
+# one result at a time, webhook requests are handled on threads of their own
+_lock = threading.Lock()
+
+
+def to_event(
+    summary: Summary, event_filter: Optional[EventFilter] = None
+) -> LinealCupEvent:
+    """The lineal cup event of a finished match, ValueError if it does not count towards a cup"""
+    competitors = summary.sport_event.competitors
+    winner_id = summary.sport_event_status.winner_id
+    if len(competitors) != 2:
+        raise ValueError(f"{summary.sport_event.id} does not have 2 competitors")
+    if winner_id is not None and winner_id not in {c.id for c in competitors}:
+        raise ValueError(f"{summary.sport_event.id} winner is not a competitor")
+    if not app._counts(summary, event_filter or EventFilter()):
+        raise ValueError(
+            f"{summary.sport_event.id} is not a finished match that counts towards the cups"
+        )
+    return app._to_lineal_cup_event(summary)
+
+
+def _page_cups() -> List[LinealCup]:
+    """Just what the pages show of each cup, from the holder states and first logged event"""
+    cups = []
+    for gender in GENDERS:
+        state = holders.load_state(gender)
+        if state is None or not state.reigns:
+            continue
+        with eventlog.EventLog(eventlog.log_dir(gender)) as log:
+            first = [log.to_event(log.record(0), gender)] if len(log) else []
+        cups.append(
+            LinealCup(
+                competition_name=state.competition_name,
+                gender=gender,
+                events=first,
+                reigns=state.reigns,
+                statistics=holders.HolderStats.from_reigns(state.reigns).statistics(),
+            )
+        )
+    return cups
+
+
+def _apply(event: LinealCupEvent, state: LinealCupHolderState) -> LinealCupIngestResult:
+    """The result is later than any logged: append it, and update the holder from the state alone"""
+    gender = event.gender
+    eventlog.append(eventlog.log_dir(gender), [event])
+    holder = state.reigns[-1].holder if state.reigns else None
+    match = next(holders.iter_title_matches([event], holder), None)
+    if match is None:
+        # not a title match, only the log changes
+        return LinealCupIngestResult(
+            sport_event_id=event.sport_event_id,
+            gender=gender,
+            status="appended",
+            holder=holder,
+        )
+
+    details._augment_title_match(match, fetch=False)
+    holders.update_reigns(state.reigns, match)
+    statistics = holders.HolderStats.from_reigns(state.reigns).statistics()
+
+    holders.append_holder(gender, match)
+    statistics_json = output.serialize(statistics)
+    output.write(output.data_path(f"{gender}_lineal_cup_stats.json"), statistics_json)
+    output.write(
+        output.web_asset_path(f"{gender}_lineal_cup_stats.json"),
+        statistics_json,
+        precompress=True,
+    )
+    output.write(holders.state_path(gender), state)
+    shards.add_title_match(gender, match, state.reigns)
+    changefeed.publish_title_match(gender, match)
+    return LinealCupIngestResult(
+        sport_event_id=event.sport_event_id,
+        gender=gender,
+        status="appended",
+        title_match=match,
+        holder=match.holder,
+    )
+
+
+def _rebuild(
+    event: LinealCupEvent, state: Optional[LinealCupHolderState]
+) -> LinealCupIngestResult:
+    """Upsert the result into the logged events and recompute the cup, e.g. for a correction"""
+    gender = event.gender
+    with eventlog.EventLog(eventlog.log_dir(gender)) as log:
+        events = [
+            e for e in log.events(gender) if e.sport_event_id != event.sport_event_id
+        ]
+    events.append(event)
+    events.sort(key=lambda e: e.start_time)
+
+    cup = LinealCup(
+        competition_name=state.competition_name if state else event.competition_name,
+        gender=gender,
+        events=events,
+    )
+    for field, value in app.augment_cup(cup).items():
+        setattr(cup, field, value)
+    details.augment_title_match_details(cup, fetch=False)
+    # rewrites the log, unchanged outputs are skipped by `output.write`
+    app.publish_cup(cup)
+    return LinealCupIngestResult(
+        sport_event_id=event.sport_event_id,
+        gender=gender,
+        status="rebuilt",
+        title_match=next(
+            (
+                m
+                for m in reversed(cup.title_matches)
+                if m.sport_event_id == event.sport_event_id
+            ),
+            None,
+        ),
+        holder=cup.current_holder,
+    )
+
+
+def ingest(
+    summary: Summary, event_filter: Optional[EventFilter] = None
+) -> LinealCupIngestResult:
+    """Add a single finished match to its cup and republish only what it changes.
+
+    A match later than every logged one, the usual case for a live result, is appended to the
+    event log and applied to the holder state without recomputing the cup: if it is a title match
+    only the holder entries, stats, the shards of the two teams and the match's year, the change
+    feed and the pages are written. That work grows with the cup's reigns, teams and title matches
+    rather than its events, the log itself is only scanned, undecoded, for a duplicate, and the
+    pages are rendered in full. A match already logged with the same result is ignored, so a
+    result can be delivered more than once. Anything else, e.g. a corrected or late result, is
+    upserted into the logged events and the cup recomputed, as a full run would.
+
+    Args:
+        summary (Summary): the match as the sport_event_summary endpoint, or a push feed, sends it
+        event_filter (EventFilter, optional): which matches count, `EventFilter()` if None. Defaults to None.
+
+    Raises:
+        ValueError: the match is not a finished match that counts towards a cup
+    """
+    event = to_event(summary, event_filter)
+    gender = event.gender
+    with _lock:
+        with eventlog.EventLog(eventlog.log_dir(gender)) as log:
+            idx = log.find(event.sport_event_id)
+            if idx is not None and log.to_event(log.record(idx), gender) == event:
+                state = holders.load_state(gender)
+                return LinealCupIngestResult(
+                    sport_event_id=event.sport_event_id,
+                    gender=gender,
+                    status="duplicate",
+                    holder=state.reigns[-1].holder if state and state.reigns else None,
+                )
+            in_order = idx is None and (
+                not len(log)
+                or eventlog.to_us(event.start_time) >= log.time_at(len(log) - 1)
+            )
+
+        state = holders.load_state(gender)
+        if in_order and state is not None:
+            result = _apply(event, state)
+        else:
+            result = _rebuild(event, state)
+        if result.title_match is not None or result.status == "rebuilt":
+            # only the cup's page changes, the other is skipped by its inputs digest
+            pages.render_pages(_page_cups())
+    return result
+
+
+class IngestServer:
+    """A webhook for finished matches, POST a `Summary` as json to `/results`.
+
+    Responds with the `LinealCupIngestResult`, or a 400 for a record that does not validate or
+    does not count towards a cup.
+
+    Example:
+        with IngestServer().start(port=8081) as server:
+            requests.post(f"{server.base_url}/results", data=summary_json)
+    """
+
+    def __init__(self, event_filter: Optional[EventFilter] = None):
+        self.event_filter = event_filter or EventFilter()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out as separate writes, don't let nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                content = self.rfile.read(length)
+                if self.path.rstrip("/") != "/results":
+                    status, body = 404, {"error": f"Unknown path: {self.path}"}
+                else:
+                    try:
+                        summary = Summary.model_validate_json(content)
+                        result = ingest(summary, server.event_filter)
+                        status, body = 200, result.model_dump(mode="json")
+                    except ValueError as e:
+                        # pydantic's ValidationError is a ValueError too
+                        status, body = 400, {"error": str(e)}
+
+                body = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "IngestServer":
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "IngestServer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Add finished matches to the lineal cups as they end"
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="json files of one match each, or - for one match per line on stdin",
+    )
+    parser.add_argument(
+        "--serve", action="store_true", help="run the webhook instead of reading files"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        server = IngestServer().start(args.host, args.port)
+        print(f"POST matches to {server.base_url}/results", flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.stop()
+        return
+
+    for name in args.files:
+        if name == "-":
+            # e.g. a queue consumer piping messages in, one per line
+            records = (line for line in sys.stdin if line.strip())
+        else:
+            with open(name, "rb") as file:
+                records = [file.read()]
+        for record in records:
+            result = ingest(Summary.model_validate_json(record))
+            print(result.model_dump_json(), flush=True)
+
+
+if __name__ == "__main__":
+    # python -m lineal_rugby.ingest tests/fixtures/sport_event_summary.json
+    main()
@@ -0,0 +1,91 @@
+import cProfile
+import json
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# set to a file path to dump a cProfile of the whole run, e.g. for `snakeviz`
+PROFILE_ENV = "LINEAL_RUGBY_PROFILE"
+
+# counters incremented anywhere in the pipeline, e.g. "http_calls", "checkpoint_hits"
+_counters: Counter = Counter()
+_counters_lock = threading.Lock()
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add to a run-wide counter, safe from crawler threads"""
+    with _counters_lock:
+        _counters[name] += value
+
+
+def counters() -> Counter:
+    with _counters_lock:
+        return Counter(_counters)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process so far, ru_maxrss is KB on linux and bytes on mac"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def log_span(span: dict) -> None:
+    """The default sink, one json line per stage"""
+    print(json.dumps(span), flush=True)
+
+
+_sink: Callable[[dict], None] = log_span
+
+
+def set_sink(sink: Callable[[dict], None]) -> None:
+    """Send finished spans somewhere other than the log, e.g. to metrics"""
+    global _sink
+    _sink = sink
+
+
+@contextmanager
+def stage(name: str) -> Iterator[dict]:
+    """Time a pipeline stage and send it to the sink when it ends.
+
+    The span has `stage`, `wall_s`, `cpu_s`, `peak_rss_mb` (of the process so far), `items`, and
+    the `counters` that moved during the stage. Set `span["items"]` inside the block to record how
+    many things the stage handled.
+
+    Example:
+        with instrument.stage("convert") as span:
+            cups = _to_lineal_cups(data)
+            span["items"] = sum(len(cup.events) for cup in cups)
+    """
+    span = {"stage": name, "items": None}
+    before = counters()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield span
+    finally:
+        span["wall_s"] = round(time.perf_counter() - wall, 4)
+        span["cpu_s"] = round(time.process_time() - cpu, 4)
+        span["peak_rss_mb"] = round(peak_rss_mb(), 1)
+        moved = counters()
+        moved.subtract(before)
+        span["counters"] = {k: v for k, v in sorted(moved.items()) if v}
+        _sink(span)
+
+
+@contextmanager
+def profiled(path: Optional[str]) -> Iterator[None]:
+    """cProfile the block into `path` (pstats format), or do nothing if `path` is empty"""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profile written to {path}")
@@ -1,8 +1,13 @@
-from pydantic import BaseModel
+from pydantic import BaseModel as _PydanticBaseModel, ConfigDict
 from typing import List, Optional, Dict
 from datetime import datetime, date
 
 
+class BaseModel(_PydanticBaseModel):
+    # build validators/serializers on first use rather than at import, most runs only touch a few models
+    model_config = ConfigDict(defer_build=True)
+
+
 # DTOSs for the sportradar API
 class Sport(BaseModel):
     id: str
@@ -34,6 +39,7 @@ class Competitor(BaseModel):
     name: str
     country: Optional[str] = None
     gender: str
+    qualifier: Optional[str] = None  # "home" or "away"
 
 
 class SportEventContext(BaseModel):
@@ -51,11 +57,19 @@ class SportEvent(BaseModel):
     competitors: List[Competitor]
 
 
+class PeriodScore(BaseModel):
+    home_score: int
+    away_score: int
+    type: str
+    number: int
+
+
 class SportEventStatus(BaseModel):
     status: str
     match_status: Optional[str] = None  # not present if cancelled
-    # home_score: int
-    # away_score: int
+    home_score: Optional[int] = None  # not present until the match has started
+    away_score: Optional[int] = None
+    period_scores: List[PeriodScore] = []  # sport_event_summary endpoint only
     winner_id: Optional[str] = None  # not present in case of a tie
     match_tie: bool = False  # not present unless a tie
 
@@ -83,10 +97,45 @@ class SeasonSummary(BaseModel):
 
 
 class SportRadarData(BaseModel):
+    feed: str = "sevens"
     season_summaries: List[SeasonSummary] = []
 
 
+class Feed(BaseModel):
+    name: str  # namespace for the feed's caches and outputs, e.g. "sevens"
+    base_url: str
+    competition_ids: Optional[List[str]] = (
+        None  # crawl only these competitions, all if None
+    )
+
+
+class CrawlFailure(BaseModel):
+    season_id: str
+    name: str
+    error: str
+
+
+class CrawlReport(BaseModel):
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    fetched: int = 0
+    resumed: int = 0  # seasons loaded from a checkpoint instead of the api
+    failed: List[CrawlFailure] = []
+    error: Optional[str] = (
+        None  # the whole feed failed, e.g. its seasons could not be listed
+    )
+
+
 # Domain models
+class EventFilter(BaseModel):
+    """Which sportradar matches count towards the lineal cups"""
+
+    match_statuses: List[str] = ["ended"]  # completed matches only
+    internationals_only: bool = True  # set False to include club sides
+    exclude_competition_keywords: List[str] = []  # e.g. ["friendl"], case insensitive
+    genders: Optional[List[str]] = None  # all if None
+
+
 class LinealCupEvent(BaseModel):
     start_time: datetime
     winner_name: str
@@ -94,6 +143,9 @@ class LinealCupEvent(BaseModel):
     is_tie: bool
     gender: str
     competition_name: str
+    sport_event_id: Optional[str] = None
+    winner_score: Optional[int] = None
+    loser_score: Optional[int] = None
 
 
 class LinearCupHolder(BaseModel):
@@ -105,6 +157,13 @@ class LinearCupHolders(BaseModel):
     holders: List[LinearCupHolder] = []
 
 
+class LinealCupReign(BaseModel):
+    holder: str
+    start_time: datetime
+    end_time: Optional[datetime] = None  # not present for the current holder
+    matches: int  # title matches played, including the one that won the title
+
+
 class LinealCupWinsByCountry(BaseModel):
     country: str
     wins: int
@@ -115,10 +174,118 @@ class LinealCupStatistics(BaseModel):
     winsByCountry: List[LinealCupWinsByCountry] = []
 
 
+class LinealCupTitleMatch(BaseModel):
+    start_time: datetime
+    holder: str  # holder after the match
+    winner_name: str
+    loser_name: str
+    is_tie: bool
+    competition_name: str
+    sport_event_id: Optional[str] = None
+    winner_score: Optional[int] = None
+    loser_score: Optional[int] = None
+    margin: Optional[int] = None
+
+
+class LinealCupTeamHistory(BaseModel):
+    team: str
+    gender: str
+    reigns: List[LinealCupReign] = []
+    title_matches: List[LinealCupTitleMatch] = []
+
+
+class LinealCupTimelinePage(BaseModel):
+    gender: str
+    period: str
+    title_matches: List[LinealCupTitleMatch] = []
+
+
+class LinealCupShardRef(BaseModel):
+    key: str
+    file: str
+    count: int
+    first: Optional[datetime] = None
+    last: Optional[datetime] = None
+
+
+class LinealCupShardIndex(BaseModel):
+    gender: str
+    shards: List[LinealCupShardRef] = []
+
+
+class LinealCupChange(BaseModel):
+    sequence: int
+    type: str  # "new_holder", "defence", "correction" or "removed"
+    gender: str
+    match: LinealCupTitleMatch
+    previous: Optional[LinealCupTitleMatch] = (
+        None  # the replaced match, for corrections
+    )
+
+
+class LinealCupChangeFeedState(BaseModel):
+    last_sequence: int = 0
+    title_matches: List[LinealCupTitleMatch] = []
+
+
+class LinealCupPath(BaseModel):
+    team: str
+    holder: str  # holder at `at`
+    at: datetime
+    # time ordered, the first over the holder, the last by `team`
+    wins: List[LinealCupEvent] = []
+
+
+class LinealCupHolderAt(BaseModel):
+    gender: str
+    at: datetime
+    holder: Optional[str] = None  # not present before the first result
+    since: Optional[datetime] = None  # start of the holder's reign
+
+
+class LinealCupHeadToHead(BaseModel):
+    gender: str
+    teams: List[str]
+    wins: List[int]  # wins of each of `teams`
+    ties: int
+    results: List[LinealCupEvent] = []  # time ordered, the most recent ones
+
+
+class LinealCupLeaderboard(BaseModel):
+    gender: str
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    winsByCountry: List[LinealCupWinsByCountry] = []  # title matches held in the window
+
+
+class LinealCupHolderState(BaseModel):
+    """What a single new result needs to update the holder, written with every cup"""
+
+    competition_name: str
+    gender: str
+    reigns: List[LinealCupReign] = []
+
+
+class LinealCupIngestResult(BaseModel):
+    sport_event_id: str
+    gender: str
+    status: str  # "appended", "duplicate" or "rebuilt"
+    title_match: Optional[LinealCupTitleMatch] = None  # if the result was one
+    holder: Optional[str] = None  # after the result
+
+
+class PollPlan(BaseModel):
+    generated_at: datetime
+    valid_until: datetime  # poll on every trigger after this, the plan is stale
+    poll_times: List[datetime] = []
+
+
 class LinealCup(BaseModel):
     competition_name: str
     gender: str
     events: List[LinealCupEvent]
     holders: LinearCupHolders = None
+    title_matches: List[LinealCupTitleMatch] = None  # one per holder entry
     current_holder: str = None
+    reigns: List[LinealCupReign] = None
     statistics: LinealCupStatistics = None
@@ -0,0 +1,110 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from typing import Iterable, Optional, Union
+from pydantic import BaseModel
+from . import instrument
+
+try:
+    import brotli
+except ImportError:  # optional, only .gz siblings are written without it
+    brotli = None
+
+DATA_DIR = "data"
+WEB_ASSETS_DIR = "../web/assets"
+WEB_STATIC_DIR = "web_static"
+
+
+def serialize(content: Union[BaseModel, str, bytes]) -> bytes:
+    """Compact json bytes for a model, strings are encoded as-is"""
+    if isinstance(content, BaseModel):
+        content = content.model_dump_json()
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return content
+
+
+def _digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _file_digest(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as file:
+            return hashlib.file_digest(file, "sha256").hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _atomic_write(path: str, content: bytes) -> None:
+    """Write to a temp file in the same directory then rename, readers never see a partial file"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+        # mkstemp creates 0600, outputs are read by the web server and deploy scripts
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _compressed_variants(content: bytes) -> dict:
+    # mtime=0 keeps the .gz bytes stable across runs, so unchanged content stays unchanged
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    return variants
+
+
+def write(
+    paths: Union[str, Iterable[str]],
+    content: Union[BaseModel, str, bytes],
+    precompress: bool = False,
+) -> bool:
+    """Serialize once and write to every path, skipping paths whose content is unchanged.
+
+    Args:
+        paths (Union[str, Iterable[str]]): file path(s) to write the same content to
+        content (Union[BaseModel, str, bytes]): a model is dumped as compact json
+        precompress (bool, optional): also write `.gz` (and `.br` if brotli is installed) siblings. Defaults to False.
+
+    Returns:
+        bool: whether any file was written
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    content = serialize(content)
+    digest = _digest(content)
+
+    written = False
+    variants = None
+    for path in paths:
+        if _file_digest(path) == digest:
+            instrument.count("files_unchanged")
+            continue
+        if precompress:
+            variants = variants or _compressed_variants(content)
+            for suffix, compressed in variants.items():
+                _atomic_write(path + suffix, compressed)
+        # the plain file goes last, so its digest only matches once the siblings are in place
+        _atomic_write(path, content)
+        instrument.count("files_written")
+        written = True
+    return written
+
+
+def data_path(filename: str) -> str:
+    return os.path.join(DATA_DIR, filename)
+
+
+def web_asset_path(filename: str) -> str:
+    return os.path.join(WEB_ASSETS_DIR, filename)
+
+
+def web_static_path(filename: str) -> str:
+    return os.path.join(WEB_STATIC_DIR, filename)
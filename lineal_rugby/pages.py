@@ -0,0 +1,190 @@
+import glob
+import hashlib
+import html
+import json
+import os
+import re
+from string import Template
+from typing import List
+from . import output
+from .models import LinealCup
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+# input digest per page, so unchanged pages are not re-rendered
+MANIFEST_FILENAME = "pages_manifest.json"
+
+SHIELD_NAMES = {"men": "Haig Shield", "women": "Signes Shield"}
+GENDER_LABELS = {"men": "men's", "women": "women's"}
+
+TABLE_CLASS = "w-full text-sm text-left rtl:text-right text-gray-500 dark:text-gray-400"
+THEAD_CLASS = (
+    "text-xs text-gray-700 uppercase bg-gray-50 dark:bg-gray-700 dark:text-gray-400"
+)
+ROW_CLASS = "bg-white border-b dark:bg-gray-800 dark:border-gray-700"
+LINK_CLASS = "font-medium text-blue-600 dark:text-blue-500 hover:underline"
+
+
+def _read_template(filename: str) -> str:
+    with open(os.path.join(TEMPLATES_DIR, filename), "r") as file:
+        return file.read()
+
+
+def minify(page: str) -> str:
+    """Drop comments and collapse whitespace, the templates have no whitespace-sensitive content"""
+    page = re.sub(r"<!--.*?-->", "", page, flags=re.DOTALL)
+    page = re.sub(r">\s+<", "><", page)
+    return re.sub(r"\s+", " ", page).strip()
+
+
+def _table(headers: List[str], rows: List[List[str]]) -> str:
+    head = "".join(f'<th scope="col" class="px-6 py-3">{h}</th>' for h in headers)
+    body = "".join(
+        f'<tr class="{ROW_CLASS}">'
+        + "".join(f'<td class="px-6">{html.escape(str(c))}</td>' for c in row)
+        + "</tr>"
+        for row in rows
+    )
+    return (
+        f'<table class="{TABLE_CLASS}"><thead class="{THEAD_CLASS}"><tr>{head}</tr></thead>'
+        f"<tbody>{body}</tbody></table>"
+    )
+
+
+def _hashed_asset(filename: str, content: bytes) -> str:
+    """Write `assets/<name>.<hash><ext>` and return its url, the name changes whenever the content does.
+
+    The previous generation is kept, so pages still cached with the old url don't 404, anything
+    older is removed along with its precompressed siblings.
+    """
+    stem, ext = os.path.splitext(filename)
+    hashed_filename = f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+    path = output.web_static_path(os.path.join("assets", hashed_filename))
+    output.write(path, content, precompress=True)
+
+    previous = glob.glob(
+        output.web_static_path(os.path.join("assets", f"{stem}.*{ext}"))
+    )
+    previous = sorted(
+        (p for p in previous if p != path), key=os.path.getmtime, reverse=True
+    )
+    for stale in previous[1:]:
+        for sibling in glob.glob(glob.escape(stale) + "*"):
+            os.remove(sibling)
+    return f"assets/{hashed_filename}"
+
+
+def _format_date(value) -> str:
+    return value.strftime("%d %b %Y") if value else "-"
+
+
+def _shield(model: LinealCup, links: str = "") -> str:
+    leaderboard = _table(
+        ["Team Name", "Number of Wins"],
+        [[w.country, w.wins] for w in model.statistics.winsByCountry],
+    )
+    return Template(_read_template("shield.html")).substitute(
+        shield_name=SHIELD_NAMES.get(model.gender, model.competition_name),
+        gender_label=GENDER_LABELS.get(model.gender, model.gender),
+        since=model.events[0].start_time.year if model.events else "",
+        current_holder=html.escape(model.statistics.currentHolder or ""),
+        table=leaderboard,
+        links=links,
+    )
+
+
+def _reigns(model: LinealCup) -> str:
+    reigns = _table(
+        ["Holder", "From", "To", "Title Matches"],
+        [
+            [r.holder, _format_date(r.start_time), _format_date(r.end_time), r.matches]
+            for r in reversed(model.reigns or [])
+        ],
+    )
+    return (
+        '<article class="flex flex-col shadow my-4"><div class="bg-white flex flex-col justify-start p-6">'
+        '<p class="text-3xl font-bold hover:text-gray-700 pb-4">Reigns</p>'
+        f'<div class="relative overflow-x-auto">{reigns}</div></div></article>'
+    )
+
+
+def _page(title: str, heading: str, stylesheet: str, content: str) -> str:
+    return Template(_read_template("page.html")).substitute(
+        title=html.escape(title),
+        heading=html.escape(heading),
+        stylesheet=stylesheet,
+        content=content,
+    )
+
+
+def _render_index(cups: List[LinealCup], stylesheet: str) -> str:
+    content = "".join(
+        _shield(
+            cup,
+            links=f'<p class="pt-6"><a class="{LINK_CLASS}" href="{cup.gender}.html">Reigns and full history</a></p>',
+        )
+        for cup in cups
+    )
+    return _page(
+        "Haig & Signes Shields",
+        "The Haig Shield and Signes Shield",
+        stylesheet,
+        content,
+    )
+
+
+def _render_cup(cup: LinealCup, stylesheet: str) -> str:
+    stats_url = _hashed_asset(
+        f"{cup.gender}_lineal_cup_stats.json", output.serialize(cup.statistics)
+    )
+    shield_name = SHIELD_NAMES.get(cup.gender, cup.competition_name)
+    links = f'<p class="pt-6"><a class="{LINK_CLASS}" href="{stats_url}">Download the data</a></p>'
+    return _page(
+        shield_name, shield_name, stylesheet, _shield(cup, links) + _reigns(cup)
+    )
+
+
+def _inputs_digest(cups: List[LinealCup]) -> str:
+    digest = hashlib.sha256()
+    for filename in sorted(os.listdir(TEMPLATES_DIR)):
+        digest.update(_read_template(filename).encode("utf-8"))
+    for cup in cups:
+        digest.update(output.serialize(cup.statistics))
+        digest.update(
+            json.dumps([r.model_dump(mode="json") for r in cup.reigns or []]).encode(
+                "utf-8"
+            )
+        )
+    return digest.hexdigest()
+
+
+def render_pages(cups: List[LinealCup]) -> None:
+    """Render the index and per-cup pages into `web_static/` as minified, precompressed html.
+
+    A page is only re-rendered when its inputs (stats, reigns, templates) changed since the last run.
+    """
+    manifest_path = output.data_path(MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        manifest = {}
+
+    stylesheet = _hashed_asset("site.css", _read_template("site.css").encode("utf-8"))
+
+    pages = {"index.html": (cups, lambda: _render_index(cups, stylesheet))}
+    for cup in cups:
+        pages[f"{cup.gender}.html"] = (
+            [cup],
+            lambda cup=cup: _render_cup(cup, stylesheet),
+        )
+
+    for filename, (page_cups, render) in pages.items():
+        path = output.web_static_path(filename)
+        digest = _inputs_digest(page_cups)
+        if manifest.get(filename) == digest and os.path.exists(path):
+            continue
+        output.write(path, minify(render()), precompress=True)
+        manifest[filename] = digest
+
+    output.write(manifest_path, json.dumps(manifest))
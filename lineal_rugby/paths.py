@@ -0,0 +1,194 @@
+import argparse
+import time
+from bisect import bisect_right
+from datetime import datetime, timezone
+from functools import cached_property
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from . import eventlog, holders
+from .models import LinealCupEvent, LinealCupPath
+
+# a team's arrival time before any result, i.e. the holder's
+NEVER = -(2**63)
+
+
+class ResultsGraph:
+    """Every decided result of a cup as an edge from loser to winner, indexed by team and time.
+
+    A chain of results from the holder to a team is a sequence of wins, each later than the one
+    before, starting with a win over the holder and ending with one by the team: had they all been
+    title matches the cup would have passed down the chain. `paths` finds the shortest chain for
+    every team at once with a breadth first search over the wins, where each step only follows
+    results after the previous one.
+
+    Example:
+        graph = ResultsGraph.from_events(cup.events)
+        graph.path("Kenya").wins  # e.g. Kenya beat Samoa, who beat Fiji, the holder
+    """
+
+    def __init__(self, event: Callable[[int], LinealCupEvent]):
+        self._event = event
+        # loser -> winner -> start times (us) of the loser's defeats by the winner, and the index
+        # of the event of each
+        self._losses: Dict[str, Dict[str, Tuple[List[int], List[int]]]] = {}
+        # start times (us) of the title matches, and the holder after each
+        self._title_times: List[int] = []
+        self._title_holders: List[str] = []
+
+    def _add(self, idx: int, event: LinealCupEvent) -> None:
+        if event.is_tie:
+            return
+        by_winner = self._losses.setdefault(event.loser_name, {})
+        times, indexes = by_winner.setdefault(event.winner_name, ([], []))
+        times.append(eventlog.to_us(event.start_time))
+        indexes.append(idx)
+
+    @classmethod
+    def _build(
+        cls, events: Iterable[LinealCupEvent], event: Callable[[int], LinealCupEvent]
+    ) -> "ResultsGraph":
+        graph = cls(event)
+
+        def indexed(events: Iterable[LinealCupEvent]) -> Iterator[LinealCupEvent]:
+            for idx, e in enumerate(events):
+                graph._add(idx, e)
+                yield e
+
+        # one pass over the events, the holder engine sees them as they are indexed
+        for match in holders.iter_title_matches(indexed(events)):
+            graph._title_times.append(eventlog.to_us(match.start_time))
+            graph._title_holders.append(match.holder)
+        return graph
+
+    @classmethod
+    def from_events(cls, events: List[LinealCupEvent]) -> "ResultsGraph":
+        """From a cup's time ordered events"""
+        return cls._build(events, events.__getitem__)
+
+    @classmethod
+    def from_log(cls, log: eventlog.EventLog, gender: str) -> "ResultsGraph":
+        """From an event log, only the results on a returned path are decoded twice"""
+        return cls._build(
+            log.events(gender), lambda idx: log.to_event(log.record(idx), gender)
+        )
+
+    @cached_property
+    def teams(self) -> List[str]:
+        """Every team with a decided result"""
+        teams = set(self._losses)
+        for by_winner in self._losses.values():
+            teams.update(by_winner)
+        return sorted(teams)
+
+    def holder_at(self, at_us: int) -> Optional[str]:
+        idx = bisect_right(self._title_times, at_us)
+        return self._title_holders[idx - 1] if idx else None
+
+    def _search(self, holder: str, at_us: int) -> List[Dict[str, Tuple]]:
+        """Breadth first over hops: level k has each team whose earliest arrival improved with k wins.
+
+        A team's earliest arrival is all that matters for longer chains, later results are a
+        superset of what an earlier arrival can follow, so each level only expands the teams whose
+        arrival improved in the level before.
+        """
+        arrival = {holder: NEVER}
+        levels = [{holder: (NEVER, None, None)}]
+        teams = len(self.teams)
+        # once every team is reached their distances are final, earlier arrivals change nothing
+        while levels[-1] and len(arrival) < teams:
+            improved: Dict[str, Tuple] = {}
+            for team in levels[-1]:
+                after = arrival[team]
+                # only each winner's first defeat of the team after it arrived can improve them
+                for winner, (times, indexes) in self._losses.get(team, {}).items():
+                    j = bisect_right(times, after)
+                    if j == len(times) or times[j] > at_us:
+                        continue
+                    t = times[j]
+                    best = improved.get(winner)
+                    if t < arrival.get(winner, at_us + 1) and (
+                        best is None or t < best[0]
+                    ):
+                        improved[winner] = (t, team, indexes[j])
+            for team, (t, _, _) in improved.items():
+                arrival[team] = t
+            levels.append(improved)
+        return levels
+
+    def _path(
+        self, team: str, holder: str, at: datetime, levels: List[Dict[str, Tuple]]
+    ) -> Optional[LinealCupPath]:
+        level = next((k for k, found in enumerate(levels) if team in found), None)
+        if level is None:
+            return None
+        wins, step = [], team
+        # the first time a team is reached it is by a team reached in the level before
+        for k in range(level, 0, -1):
+            _, step, idx = levels[k][step]
+            wins.append(self._event(idx))
+        return LinealCupPath(team=team, holder=holder, at=at, wins=wins[::-1])
+
+    def paths(self, at: Optional[datetime] = None) -> Dict[str, LinealCupPath]:
+        """The shortest chain of results from the holder at `at` (default now) to every team with one.
+
+        Teams that never beat anyone in a chain from the holder are left out.
+        """
+        at = at or datetime.now(timezone.utc)
+        at_us = eventlog.to_us(at)
+        holder = self.holder_at(at_us)
+        if holder is None:
+            return {}
+        levels = self._search(holder, at_us)
+        paths = {}
+        for level in levels:
+            for team in level:
+                if team not in paths:
+                    paths[team] = self._path(team, holder, at, levels)
+        return paths
+
+    def path(self, team: str, at: Optional[datetime] = None) -> Optional[LinealCupPath]:
+        """The shortest chain of results from the holder at `at` (default now) to `team`"""
+        at = at or datetime.now(timezone.utc)
+        at_us = eventlog.to_us(at)
+        holder = self.holder_at(at_us)
+        if holder is None:
+            return None
+        return self._path(team, holder, at, self._search(holder, at_us))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Shortest chains of results from the lineal cup holder to each team"
+    )
+    parser.add_argument("gender")
+    parser.add_argument(
+        "team", nargs="?", help="show this team's chain, all if omitted"
+    )
+    parser.add_argument("--at", type=datetime.fromisoformat, default=None)
+    args = parser.parse_args(argv)
+
+    with eventlog.EventLog(eventlog.log_dir(args.gender)) as log:
+        graph = ResultsGraph.from_log(log, args.gender)
+        start = time.perf_counter()
+        paths = graph.paths(args.at)
+        seconds = time.perf_counter() - start
+
+        if args.team:
+            path = paths.get(args.team)
+            if path is None:
+                print(f"No chain of results from the holder to {args.team}")
+                return
+            print(f"{args.team} is {len(path.wins)} win(s) from {path.holder}:")
+            for win in path.wins:
+                print(
+                    f"  {win.start_time:%Y-%m-%d} {win.winner_name} beat {win.loser_name} ({win.competition_name})"
+                )
+            return
+
+        for team, path in sorted(paths.items(), key=lambda x: (len(x[1].wins), x[0])):
+            print(f"{len(path.wins):>3} {team}")
+        print(f"{len(paths)} teams in {seconds * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    # python -m lineal_rugby.paths men Kenya
+    main()
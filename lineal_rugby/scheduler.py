@@ -0,0 +1,63 @@
+from datetime import datetime, time, timedelta, timezone
+from typing import List, Optional
+from .models import PollPlan, SportRadarData
+
+# two 7 minute halves plus half time, stoppages and conversions, rounded up
+MATCH_DURATION = timedelta(minutes=30)
+
+# polls after the expected end of each fixture, results can take a while to be confirmed
+POLL_OFFSETS = (timedelta(minutes=15), timedelta(minutes=45), timedelta(hours=2))
+
+# between tournaments, one poll a day picks up newly published fixtures and late corrections
+IDLE_POLL_TIME = time(6, 0, tzinfo=timezone.utc)
+
+# polls closer together than this are merged, the trigger is hourly anyway
+MIN_POLL_SPACING = timedelta(minutes=15)
+
+# fixtures with these statuses can still produce a result
+UNFINISHED_STATUSES = {"not_started", "live", "delayed", "interrupted", "suspended"}
+
+PLAN_HORIZON = timedelta(days=14)
+
+
+def _fixture_start_times(data: SportRadarData, start: datetime, end: datetime):
+    for season_summary in data.season_summaries:
+        for summary in season_summary.summaries:
+            if summary.sport_event_status.status not in UNFINISHED_STATUSES:
+                continue
+            if start <= summary.sport_event.start_time <= end:
+                yield summary.sport_event.start_time
+
+
+def build_poll_plan(
+    data: SportRadarData,
+    now: Optional[datetime] = None,
+    horizon: timedelta = PLAN_HORIZON,
+) -> PollPlan:
+    """Poll times for the next `horizon`, shortly after each known fixture should have finished.
+
+    The ETL lambda checks each trigger against this plan (see `service/lambdas/utils/scheduler.py`)
+    and returns without any network I/O when no poll is due. Fixtures that started up to a day ago
+    are included, to pick up delayed or interrupted matches.
+    """
+    now = now or datetime.now(timezone.utc)
+    valid_until = now + horizon
+
+    poll_times = [
+        start_time + MATCH_DURATION + offset
+        for start_time in _fixture_start_times(
+            data, now - timedelta(days=1), valid_until
+        )
+        for offset in POLL_OFFSETS
+    ]
+    day = now.date()
+    while (idle_poll := datetime.combine(day, IDLE_POLL_TIME)) <= valid_until:
+        poll_times.append(idle_poll)
+        day += timedelta(days=1)
+
+    merged: List[datetime] = []
+    for poll_time in sorted(t for t in poll_times if now <= t <= valid_until):
+        if not merged or poll_time - merged[-1] >= MIN_POLL_SPACING:
+            merged.append(poll_time)
+
+    return PollPlan(generated_at=now, valid_until=valid_until, poll_times=merged)
@@ -0,0 +1,413 @@
+import argparse
+import json
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+from pydantic import BaseModel
+from . import eventlog, holders, instrument, output
+from .models import (
+    LinealCupEvent,
+    LinealCupHeadToHead,
+    LinealCupHolderAt,
+    LinealCupLeaderboard,
+    LinealCupReign,
+    LinealCupStatistics,
+    LinealCupTeamHistory,
+    LinealCupTitleMatch,
+    LinealCupWinsByCountry,
+)
+
+GENDERS = ("men", "women")
+
+# seconds between checks for a new or appended event log
+RELOAD_INTERVAL = 1.0
+
+# most recent title matches or results in a response, unless `limit` says otherwise
+DEFAULT_LIMIT = 50
+
+
+def _fingerprint(gender: str) -> Optional[Tuple[int, int, int]]:
+    """Changes with every append (size) and rewrite (a new file replaces the old one)"""
+    try:
+        stat = os.stat(os.path.join(eventlog.log_dir(gender), eventlog.EVENTS_FILENAME))
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _pair(team_a: str, team_b: str) -> Tuple[str, str]:
+    return (team_a, team_b) if team_a <= team_b else (team_b, team_a)
+
+
+class CupIndex:
+    """Everything the queries on one cup need, built once from its event log and never modified.
+
+    The holder after every title match is kept in time order, so the holder at any time is one
+    bisect, along with each team's reigns and title matches, the times each team held the title
+    (for leaderboards over any window), and the results between every pair of teams. Events are
+    only decoded from the mapped log when a response includes them. The log stays mapped for as
+    long as the index is referenced, so a request that started before a reload finishes on the
+    index it started with.
+    """
+
+    def __init__(self, log: eventlog.EventLog, gender: str, fingerprint: Tuple):
+        self.log = log
+        self.gender = gender
+        self.fingerprint = fingerprint
+        self.generation = log.generation
+        self.events = len(log)
+        self.loaded_at = datetime.now(timezone.utc)
+        self.statistics: Optional[LinealCupStatistics] = None
+        # per title match: start time (us), event index in the log, holder after it, and reign
+        self._title_times = array("q")
+        self._title_events = array("q")
+        self._title_holders: List[str] = []
+        self._title_reigns = array("q")
+        self._reigns: List[LinealCupReign] = []
+        self._team_reigns: Dict[str, List[LinealCupReign]] = {}
+        # title match indexes of each team, as winner or loser
+        self._team_matches: Dict[str, array] = {}
+        # start times (us) of the title matches after which each team held the title
+        self._held: Dict[str, array] = {}
+        # event indexes of the results between two teams, and the wins of each and ties
+        self._pairs: Dict[Tuple[str, str], Tuple[array, List[int]]] = {}
+        self._teams = set()
+
+    @classmethod
+    def load(cls, gender: str) -> Optional["CupIndex"]:
+        """Index the cup's event log as it is now, None if it has not been written yet"""
+        fingerprint = _fingerprint(gender)
+        log = eventlog.EventLog(eventlog.log_dir(gender))
+        if log.generation is None:
+            return None
+        index = cls(log, gender, fingerprint)
+        with instrument.stage(f"index.{gender}") as span:
+            index._build()
+            span["items"] = index.events
+        return index
+
+    def _add_result(self, idx: int, event: LinealCupEvent) -> None:
+        self._teams.update((event.winner_name, event.loser_name))
+        pair = _pair(event.winner_name, event.loser_name)
+        if pair not in self._pairs:
+            self._pairs[pair] = (array("q"), [0, 0, 0])
+        indexes, counts = self._pairs[pair]
+        indexes.append(idx)
+        counts[2 if event.is_tie else pair.index(event.winner_name)] += 1
+
+    def _add_title_match(self, idx: int, match: LinealCupTitleMatch) -> None:
+        n = len(self._title_times)
+        start_us = eventlog.to_us(match.start_time)
+        if not self._reigns or self._reigns[-1].holder != match.holder:
+            if self._reigns:
+                self._reigns[-1].end_time = match.start_time
+            reign = LinealCupReign(
+                holder=match.holder, start_time=match.start_time, matches=0
+            )
+            self._reigns.append(reign)
+            self._team_reigns.setdefault(match.holder, []).append(reign)
+        self._reigns[-1].matches += 1
+
+        self._title_times.append(start_us)
+        self._title_events.append(idx)
+        self._title_holders.append(match.holder)
+        self._title_reigns.append(len(self._reigns) - 1)
+        for team in {match.winner_name, match.loser_name}:
+            self._team_matches.setdefault(team, array("q")).append(n)
+        self._held.setdefault(match.holder, array("q")).append(start_us)
+
+    def _build(self) -> None:
+        """One pass over the log, the holder engine sees each event as it is indexed"""
+        stats = holders.HolderStats()
+        idx = -1
+
+        def indexed():
+            nonlocal idx
+            for idx, event in enumerate(self.log.events(self.gender)):
+                self._add_result(idx, event)
+                yield event
+
+        for match in holders.iter_title_matches(indexed()):
+            # the engine yields a title match as soon as it has seen its event
+            self._add_title_match(idx, match)
+            stats.update(match.holder)
+        self.statistics = stats.statistics() if stats.matches else None
+
+    def _event(self, idx: int) -> LinealCupEvent:
+        return self.log.to_event(self.log.record(idx), self.gender)
+
+    def _title_match(self, n: int) -> LinealCupTitleMatch:
+        return holders._to_title_match(
+            self._event(self._title_events[n]), self._title_holders[n]
+        )
+
+    def has_team(self, team: str) -> bool:
+        return team in self._teams
+
+    def holder_at(self, at: datetime) -> LinealCupHolderAt:
+        n = bisect_right(self._title_times, eventlog.to_us(at))
+        if not n:
+            return LinealCupHolderAt(gender=self.gender, at=at)
+        reign = self._reigns[self._title_reigns[n - 1]]
+        return LinealCupHolderAt(
+            gender=self.gender, at=at, holder=reign.holder, since=reign.start_time
+        )
+
+    def team_history(
+        self, team: str, limit: int = DEFAULT_LIMIT
+    ) -> LinealCupTeamHistory:
+        """A team's reigns and its `limit` most recent title matches (all for 0)"""
+        matches = self._team_matches.get(team, array("q"))[-limit:]
+        return LinealCupTeamHistory(
+            team=team,
+            gender=self.gender,
+            reigns=self._team_reigns.get(team, []),
+            title_matches=[self._title_match(n) for n in matches],
+        )
+
+    def head_to_head(
+        self, team_a: str, team_b: str, limit: int = DEFAULT_LIMIT
+    ) -> LinealCupHeadToHead:
+        """Wins and ties between two teams in any match, with their `limit` most recent results"""
+        pair = _pair(team_a, team_b)
+        indexes, counts = self._pairs.get(pair, (array("q"), [0, 0, 0]))
+        wins = counts[:2] if pair[0] == team_a else counts[1::-1]
+        return LinealCupHeadToHead(
+            gender=self.gender,
+            teams=[team_a, team_b],
+            wins=wins,
+            ties=counts[2],
+            results=[self._event(idx) for idx in indexes[-limit:]],
+        )
+
+    def leaderboard(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> LinealCupLeaderboard:
+        """Title matches held per team in [start_time, end_time), two bisects per team"""
+        start_us = None if start_time is None else eventlog.to_us(start_time)
+        end_us = None if end_time is None else eventlog.to_us(end_time)
+        counts = []
+        for team, times in self._held.items():
+            held = (len(times) if end_us is None else bisect_left(times, end_us)) - (
+                0 if start_us is None else bisect_left(times, start_us)
+            )
+            if held > 0:
+                counts.append((team, held))
+        counts.sort(key=lambda x: (-x[1], x[0]))
+        return LinealCupLeaderboard(
+            gender=self.gender,
+            start_time=start_time,
+            end_time=end_time,
+            winsByCountry=[
+                LinealCupWinsByCountry(country=team, wins=held)
+                for team, held in counts[: limit or None]
+            ],
+        )
+
+
+class QueryError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _time(query: Dict[str, List[str]], name: str) -> Optional[datetime]:
+    value = query.get(name, [None])[0]
+    if value is None:
+        return None
+    try:
+        value = datetime.fromisoformat(value)
+    except ValueError:
+        raise QueryError(400, f"{name} is not an ISO 8601 time: {value}")
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _limit(query: Dict[str, List[str]]) -> int:
+    value = query.get("limit", [str(DEFAULT_LIMIT)])[0]
+    if not value.isdigit():
+        raise QueryError(400, f"limit is not a whole number: {value}")
+    return int(value)
+
+
+class QueryService:
+    """Answers holder, team history, head-to-head and leaderboard queries from in-memory indexes.
+
+    Each cup's index is built once from its event log (see `CupIndex`) and rebuilt in a background
+    thread when the pipeline appends to or rewrites the log. A rebuilt index replaces the old one in
+    a single reference swap, so requests never wait on a reload and never see half of one.
+
+    Example:
+        with QueryService().start(port=8080) as service:
+            ...  # GET http://127.0.0.1:8080/men/holder?at=2023-01-01
+    """
+
+    def __init__(
+        self,
+        genders: Tuple[str, ...] = GENDERS,
+        reload_interval: float = RELOAD_INTERVAL,
+    ):
+        self.genders = genders
+        self.reload_interval = reload_interval
+        # replaced as a whole, never modified, so readers need no lock
+        self._indexes: Dict[str, CupIndex] = {}
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def index(self, gender: str) -> Optional[CupIndex]:
+        return self._indexes.get(gender)
+
+    def reload(self) -> List[str]:
+        """Rebuild the index of every cup whose event log changed, returns the genders reloaded"""
+        reloaded = []
+        with self._reload_lock:
+            for gender in self.genders:
+                current = self._indexes.get(gender)
+                fingerprint = _fingerprint(gender)
+                if fingerprint is None or (
+                    current is not None and current.fingerprint == fingerprint
+                ):
+                    continue
+                index = CupIndex.load(gender)
+                if index is None:
+                    continue
+                # requests already holding the old index finish on it, then its log is unmapped
+                self._indexes = {**self._indexes, gender: index}
+                instrument.count("index_reloads")
+                reloaded.append(gender)
+        return reloaded
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                # e.g. a log caught mid-rewrite, keep serving the previous index and retry
+                print(f"Reload failed, serving the previous index: {e!r}", flush=True)
+
+    def health(self) -> dict:
+        return {
+            gender: {
+                "generation": index.generation,
+                "events": index.events,
+                "loaded_at": index.loaded_at.isoformat(),
+            }
+            for gender, index in self._indexes.items()
+        }
+
+    def query(self, path: str, query: Dict[str, List[str]]) -> BaseModel:
+        """Route a request path, e.g. `/men/holder`, raises `QueryError` for a bad request"""
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        index = self.index(parts[0])
+        if index is None:
+            raise QueryError(404, f"No cup loaded for {parts[0]}")
+        for team in parts[2:]:
+            if not index.has_team(team):
+                raise QueryError(404, f"No results for {team}")
+
+        match parts[1:]:
+            case ["holder"]:
+                return index.holder_at(_time(query, "at") or datetime.now(timezone.utc))
+            case ["stats"]:
+                if index.statistics is None:
+                    raise QueryError(404, f"No title matches for {index.gender}")
+                return index.statistics
+            case ["teams", team]:
+                return index.team_history(team, _limit(query))
+            case ["head-to-head", team_a, team_b]:
+                return index.head_to_head(team_a, team_b, _limit(query))
+            case ["leaderboard"]:
+                return index.leaderboard(
+                    _time(query, "from"), _time(query, "to"), _limit(query)
+                )
+        raise QueryError(404, f"Unknown query: {path}")
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out as separate writes, don't let nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status = 200
+                try:
+                    if url.path.strip("/") == "health":
+                        body = json.dumps(service.health()).encode("utf-8")
+                    else:
+                        body = output.serialize(
+                            service.query(url.path, parse_qs(url.query))
+                        )
+                except QueryError as e:
+                    status = e.status
+                    body = json.dumps({"error": str(e)}).encode("utf-8")
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "QueryService":
+        """Load every cup, then serve and watch for new outputs in background threads"""
+        self.reload()
+        self._stop.clear()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._watch, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "QueryService":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Serve lineal cup queries from the event logs, reloading as they change"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL)
+    args = parser.parse_args(argv)
+
+    service = QueryService(reload_interval=args.reload_interval)
+    service.start(args.host, args.port)
+    print(f"Serving {', '.join(service.health())} on {service.base_url}", flush=True)
+    try:
+        service._stop.wait()
+    except KeyboardInterrupt:
+        service.stop()
+
+
+if __name__ == "__main__":
+    # python -m lineal_rugby.service --port 8080
+    main()
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Type, TypeVar
+from . import output
+from .models import (
+    BaseModel,
+    LinealCup,
+    LinealCupReign,
+    LinealCupShardIndex,
+    LinealCupShardRef,
+    LinealCupTeamHistory,
+    LinealCupTimelinePage,
+    LinealCupTitleMatch,
+)
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _shard_path(gender: str, kind: str, filename: str) -> str:
+    return output.web_asset_path(os.path.join(gender, kind, filename))
+
+
+def _team_filenames(gender: str, teams: Iterable[str]) -> Dict[str, str]:
+    """The shard file of each team, `{slug}.json` unless another team already has that slug.
+
+    Names that slugify the same, e.g. "Hong Kong" and "Hong-Kong", would overwrite each
+    other's shard, so the later team's file is suffixed with a hash of its name. Teams keep the
+    file the index already gives them, so a new team never takes over another's.
+    """
+    index = _read(_shard_path(gender, "teams", "index.json"), LinealCupShardIndex)
+    previous = {ref.key: ref.file for ref in index.shards} if index else {}
+    owners = {file: team for team, file in previous.items()}
+    filenames = {}
+    for team in teams:
+        filename = previous.get(team)
+        if filename is None:
+            slug = slugify(team)
+            filename = f"{slug}.json"
+            if owners.get(filename, team) != team:
+                digest = hashlib.sha256(team.encode("utf-8")).hexdigest()[:8]
+                filename = f"{slug}-{digest}.json"
+            owners[filename] = team
+        filenames[team] = filename
+    return filenames
+
+
+def _prune(gender: str, kind: str, refs: List[LinealCupShardRef]) -> None:
+    """Remove shards, and their precompressed siblings, that are no longer in the index"""
+    directory = os.path.dirname(_shard_path(gender, kind, "index.json"))
+    keep = {ref.file for ref in refs} | {"index.json"}
+    for name in os.listdir(directory):
+        if name.startswith("."):
+            # an in progress write
+            continue
+        if name.removesuffix(".gz").removesuffix(".br") not in keep:
+            os.remove(os.path.join(directory, name))
+
+
+def _write_index(gender: str, kind: str, refs: List[LinealCupShardRef]) -> None:
+    index = LinealCupShardIndex(gender=gender, shards=refs)
+    output.write(_shard_path(gender, kind, "index.json"), index, precompress=True)
+
+
+def _ref(
+    key: str, filename: str, matches: List[LinealCupTitleMatch]
+) -> LinealCupShardRef:
+    return LinealCupShardRef(
+        key=key,
+        file=filename,
+        count=len(matches),
+        first=matches[0].start_time if matches else None,
+        last=matches[-1].start_time if matches else None,
+    )
+
+
+def write_team_shards(model: LinealCup, matches: List[LinealCupTitleMatch]) -> None:
+    """One file per team with its reigns and title matches, `{gender}/teams/{team}.json`"""
+    histories: Dict[str, LinealCupTeamHistory] = {}
+
+    def history(team: str) -> LinealCupTeamHistory:
+        if team not in histories:
+            histories[team] = LinealCupTeamHistory(team=team, gender=model.gender)
+        return histories[team]
+
+    for reign in model.reigns:
+        history(reign.holder).reigns.append(reign)
+    for match in matches:
+        history(match.winner_name).title_matches.append(match)
+        history(match.loser_name).title_matches.append(match)
+
+    refs = []
+    filenames = _team_filenames(model.gender, sorted(histories))
+    for team in sorted(histories):
+        filename = filenames[team]
+        output.write(
+            _shard_path(model.gender, "teams", filename),
+            histories[team],
+            precompress=True,
+        )
+        refs.append(_ref(team, filename, histories[team].title_matches))
+    _write_index(model.gender, "teams", refs)
+    _prune(model.gender, "teams", refs)
+
+
+def write_timeline_shards(model: LinealCup, matches: List[LinealCupTitleMatch]) -> None:
+    """The holder timeline paginated by year, `{gender}/timeline/{year}.json`, with an index manifest"""
+    pages: Dict[str, List[LinealCupTitleMatch]] = defaultdict(list)
+    for match in matches:
+        pages[str(match.start_time.year)].append(match)
+
+    refs = []
+    for period in sorted(pages):
+        filename = f"{period}.json"
+        page = LinealCupTimelinePage(
+            gender=model.gender, period=period, title_matches=pages[period]
+        )
+        output.write(
+            _shard_path(model.gender, "timeline", filename), page, precompress=True
+        )
+        refs.append(_ref(period, filename, pages[period]))
+    _write_index(model.gender, "timeline", refs)
+    _prune(model.gender, "timeline", refs)
+
+
+def write_shards(model: LinealCup) -> None:
+    """Write the per-team and per-year shards for the website.
+
+    Unchanged shards are skipped by `output.write`, so a run with a few new results only rewrites
+    the current year's timeline page, the teams involved, and the two indexes. Shards of teams or
+    years no longer in the cup, e.g. after a correction, are removed.
+    """
+    write_team_shards(model, model.title_matches)
+    write_timeline_shards(model, model.title_matches)
+
+
+def _read(path: str, model: Type[M]) -> Optional[M]:
+    try:
+        with open(path, "rb") as file:
+            return model.model_validate_json(file.read())
+    except FileNotFoundError:
+        return None
+
+
+def _update_index(gender: str, kind: str, refs: List[LinealCupShardRef]) -> None:
+    index = _read(_shard_path(gender, kind, "index.json"), LinealCupShardIndex)
+    by_key = {ref.key: ref for ref in index.shards} if index else {}
+    by_key.update((ref.key, ref) for ref in refs)
+    _write_index(gender, kind, [by_key[key] for key in sorted(by_key)])
+
+
+def add_title_match(
+    gender: str, match: LinealCupTitleMatch, reigns: List[LinealCupReign]
+) -> None:
+    """Add a title match, later than any before it, to only the shards it appears in.
+
+    That is the two teams' shards, with their reigns from `reigns` (every reign of the cup), the
+    page of the match's year, and the two indexes.
+    """
+    refs = []
+    teams = list(dict.fromkeys([match.winner_name, match.loser_name]))
+    for team, filename in _team_filenames(gender, teams).items():
+        path = _shard_path(gender, "teams", filename)
+        history = _read(path, LinealCupTeamHistory) or LinealCupTeamHistory(
+            team=team, gender=gender
+        )
+        history.reigns = [reign for reign in reigns if reign.holder == team]
+        history.title_matches.append(match)
+        output.write(path, history, precompress=True)
+        refs.append(_ref(team, filename, history.title_matches))
+    _update_index(gender, "teams", refs)
+
+    period = str(match.start_time.year)
+    filename = f"{period}.json"
+    path = _shard_path(gender, "timeline", filename)
+    page = _read(path, LinealCupTimelinePage) or LinealCupTimelinePage(
+        gender=gender, period=period
+    )
+    page.title_matches.append(match)
+    output.write(path, page, precompress=True)
+    _update_index(gender, "timeline", [_ref(period, filename, page.title_matches)])
@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, TypeVar
+from .models import LinealCup
+
+T = TypeVar("T")
+
+# below this many events in total a process pool costs more to start than it saves
+PARALLEL_MIN_EVENTS = 20_000
+
+# the cups of the running stage, inherited by forked workers instead of being pickled to them
+_stage_cups: List[LinealCup] = []
+
+
+def _run(fn: Callable[[LinealCup], T], index: int) -> T:
+    return fn(_stage_cups[index])
+
+
+def _can_fork() -> bool:
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def map_cups(
+    fn: Callable[[LinealCup], T],
+    cups: List[LinealCup],
+    max_workers: Optional[int] = None,
+    min_events: int = PARALLEL_MIN_EVENTS,
+) -> List[T]:
+    """Run `fn` on every cup, across a process pool when there is enough work to be worth it.
+
+    Workers are forked, so they see the cups (and their event lists) copy-on-write rather than
+    receiving a pickled copy; only the cup's index goes in and only `fn`'s result comes back, so
+    `fn` should return what it computed rather than rely on mutating the cup. Without fork (e.g.
+    on Windows) or for small inputs the cups are processed in this process, in order.
+
+    Args:
+        fn (Callable[[LinealCup], T]): module level function, so it can be sent to the workers
+        cups (List[LinealCup]): independent cups, read only while the stage runs
+        max_workers (int, optional): process count, 1 to run in-process. Defaults to one per cpu.
+        min_events (int, optional): run in-process below this many events in total. Defaults to `PARALLEL_MIN_EVENTS`.
+
+    Returns:
+        List[T]: results in the order of `cups`
+    """
+    global _stage_cups
+    workers = min(max_workers or os.cpu_count() or 1, len(cups))
+    if (
+        workers < 2
+        or sum(len(cup.events) for cup in cups) < min_events
+        or not _can_fork()
+    ):
+        return [fn(cup) for cup in cups]
+
+    _stage_cups = cups
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            return list(executor.map(_run, [fn] * len(cups), range(len(cups))))
+    finally:
+        _stage_cups = []
@@ -5,3 +5,9 @@ from typing import Optional
 class Config(BaseSettings):
     ENV: Optional[str] = "dev"
     S3_BUCKET: Optional[str] = "lineal-world-title"
+    SPORT_RADAR_API_KEY_SECRET_NAME: Optional[str] = None
+    SECRET_PREFETCH: bool = True
+    POLL_PLAN_S3_KEY: str = "poll_plan.json"
+    POLL_INTERVAL_MINUTES: int = 60  # must match the event bridge schedule
+    PROFILE: bool = False  # cProfile each invocation, uploaded to PROFILE_S3_PREFIX
+    PROFILE_S3_PREFIX: str = "profiles/"
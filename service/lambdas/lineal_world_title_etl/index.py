@@ -1,4 +1,7 @@
-from aws_lambda_powertools import Logger, Tracer
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from aws_lambda_powertools import Logger, Metrics, Tracer
 from aws_lambda_powertools.utilities.typing import LambdaContext
 from aws_lambda_powertools.utilities.data_classes import (
     event_source,
@@ -7,37 +10,121 @@ from aws_lambda_powertools.utilities.data_classes import (
 
 try:
     from .config import Config
-    from service.lambdas.utils import s3, secret_manager
+    from service.lambdas.utils import instrumentation, s3, scheduler, secret_manager
 except:
     # no relative imports from top level when deployed to lamdba
     from config import Config
 
     # no 'service.lambdas' when deployed to lamdba
-    from utils import s3, secret_manager  # type: ignore
+    from utils import instrumentation, s3, scheduler, secret_manager  # type: ignore
 
 
 logger = Logger()
+metrics = Metrics()
 tracer = Tracer()
 config = Config()
 
+if config.SPORT_RADAR_API_KEY_SECRET_NAME and config.SECRET_PREFETCH:
+    # fetch during init, so warm invocations pay zero secret-fetch latency
+    secret_manager.prefetch([config.SPORT_RADAR_API_KEY_SECRET_NAME])
+
+# cached for the life of the container, so triggers with no poll due need no network I/O
+poll_plan: Optional[scheduler.PollPlan] = None
+poll_plan_etag: Optional[str] = None
+# trigger time of the last fetch, None until the first trigger of a cold start
+poll_plan_checked_at: Optional[datetime] = None
+
+
+def _load_poll_plan(trigger_time: datetime) -> Optional[scheduler.PollPlan]:
+    """Fetch the plan deploy.sh published, only downloaded and parsed again when its ETag changed"""
+    global poll_plan, poll_plan_etag, poll_plan_checked_at
+    poll_plan_checked_at = trigger_time
+    try:
+        etag = s3.etag(config.S3_BUCKET, config.POLL_PLAN_S3_KEY)
+        if etag == poll_plan_etag:
+            instrumentation.count("PollPlanUnchanged")
+            return poll_plan
+        poll_plan = scheduler.PollPlan(
+            **s3.download_json(config.S3_BUCKET, config.POLL_PLAN_S3_KEY)
+        )
+        poll_plan_etag = etag
+    except Exception as ex:
+        logger.warning(f"No usable poll plan, polling on every trigger: {ex}")
+        poll_plan, poll_plan_etag = None, None
+    return poll_plan
+
+
+def _get_poll_plan(trigger_time: datetime) -> Optional[scheduler.PollPlan]:
+    """The cached plan, fetched on a cold start and once its horizon has passed"""
+    if poll_plan_checked_at is None or (
+        poll_plan is not None and trigger_time >= poll_plan.valid_until
+    ):
+        return _load_poll_plan(trigger_time)
+    instrumentation.count("PollPlanCacheHits")
+    return poll_plan
+
+
+def _handle(event: EventBridgeEvent) -> dict:
+    with instrumentation.stage("plan"):
+        trigger_time = datetime.fromisoformat(event.time)
+        window_start = trigger_time - timedelta(minutes=config.POLL_INTERVAL_MINUTES)
+        poll_due = scheduler.is_poll_due(
+            _get_poll_plan(trigger_time), window_start, trigger_time
+        )
+
+    if not poll_due:
+        instrumentation.count("PollsSkipped")
+        logger.info("No fixture due, skipping poll")
+        return {
+            "statusCode": 200,
+            "body": "no fixture due",
+        }
+
+    if poll_plan_checked_at != trigger_time:
+        # the poll goes ahead whatever the plan says now, revalidate it for the triggers after this one
+        with instrumentation.stage("revalidate"):
+            _load_poll_plan(trigger_time)
+
+    instrumentation.count("PollsDue")
+
+    # TODO add code!
+    with instrumentation.stage("fetch") as span:
+        files = s3.list(config.S3_BUCKET)
+        span["items"] = len(files)
+    logger.info(f"Files in bucket: {files}")
+
+    logger.info(f"Function completed succesfully!")
+    return {
+        "statusCode": 200,
+        "body": files,
+    }
+
 
 @logger.inject_lambda_context
+@metrics.log_metrics
 @tracer.capture_lambda_handler
 @event_source(data_class=EventBridgeEvent)
 def handler(event: EventBridgeEvent, context: LambdaContext) -> dict:
     """Handle ETL from a scheduled trigger from event bridge.
 
+    Each stage is an x-ray subsegment with wall time, cpu time and peak rss metrics (EMF), see
+    `instrumentation.stage`. With `PROFILE` set the invocation is also cProfiled to s3.
+
     Returns:
         dict: of `statusCode` and `body`
     """
     logger.info(f"Received event: {event}, context: {context}")
 
-    # TODO add code!
-    files = s3.list(config.S3_BUCKET)
-    logger.info(f"Files in bucket: {files}")
+    if not config.PROFILE:
+        return _handle(event)
 
-    logger.info(f"Function completed succesfully!")
-    return {
-        "statusCode": 200,
-        "body": files,
-    }
+    profile_path = f"/tmp/{context.aws_request_id}.prof"
+    with instrumentation.profiled(profile_path):
+        response = _handle(event)
+    s3.upload_file(
+        config.S3_BUCKET,
+        config.PROFILE_S3_PREFIX + os.path.basename(profile_path),
+        profile_path,
+    )
+    os.remove(profile_path)
+    return response
@@ -0,0 +1,76 @@
+import cProfile
+import resource
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from aws_lambda_powertools import Logger, Metrics, Tracer
+from aws_lambda_powertools.metrics import MetricUnit
+
+# powertools shares state between instances, so these are the handler's logger, metrics and tracer
+logger = Logger()
+metrics = Metrics()
+tracer = Tracer()
+
+
+def count(name: str, value: int = 1) -> None:
+    """A counter metric for the invocation, e.g. http calls or cache hits"""
+    metrics.add_metric(name=name, unit=MetricUnit.Count, value=value)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of the lambda process so far, ru_maxrss is KB on linux"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+@contextmanager
+def stage(name: str) -> Iterator[dict]:
+    """Time a stage of the handler as an x-ray subsegment plus EMF metrics.
+
+    Emits `{name}WallTime` and `{name}CpuTime` (ms), `{name}PeakRss` (MB) and, if set on the
+    yielded span, `{name}Items`. Metrics are flushed by the handler's `@metrics.log_metrics`.
+
+    Example:
+        with instrumentation.stage("plan") as span:
+            plan = _get_poll_plan(trigger_time)
+            span["items"] = len(plan.poll_times)
+    """
+    span = {"items": None}
+    wall, cpu = time.perf_counter(), time.process_time()
+    with tracer.provider.in_subsegment(f"## {name}") as subsegment:
+        try:
+            yield span
+        finally:
+            wall_ms = (time.perf_counter() - wall) * 1000
+            cpu_ms = (time.process_time() - cpu) * 1000
+            metrics.add_metric(
+                name=f"{name}WallTime", unit=MetricUnit.Milliseconds, value=wall_ms
+            )
+            metrics.add_metric(
+                name=f"{name}CpuTime", unit=MetricUnit.Milliseconds, value=cpu_ms
+            )
+            metrics.add_metric(
+                name=f"{name}PeakRss", unit=MetricUnit.Megabytes, value=peak_rss_mb()
+            )
+            if span["items"] is not None:
+                metrics.add_metric(
+                    name=f"{name}Items", unit=MetricUnit.Count, value=span["items"]
+                )
+            subsegment.put_metadata(
+                "span", {**span, "wall_ms": wall_ms, "cpu_ms": cpu_ms}
+            )
+
+
+@contextmanager
+def profiled(path: Optional[str]) -> Iterator[None]:
+    """cProfile the block into `path` (pstats format), or do nothing if `path` is empty"""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info(f"Profile written to {path}")
@@ -1,9 +1,10 @@
 import json
-import boto3
-import botocore
 import pydantic
 from aws_lambda_powertools import Logger
-from typing import List
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    import boto3
 
 logger = Logger()
 
@@ -14,9 +15,16 @@ class S3LinealWorldTitleEntity(pydantic.BaseModel):
     id: str
 
 
-def __get_client() -> boto3.client:
+def __get_client() -> "boto3.client":
     global __s3_client
-    __s3_client = __s3_client or boto3.client(
+    if __s3_client is not None:
+        return __s3_client
+
+    # boto3 takes ~150ms to import, defer it until the first call that needs a client
+    import boto3
+    import botocore
+
+    __s3_client = boto3.client(
         "s3",
         config=botocore.client.Config(
             connect_timeout=2,
@@ -83,6 +91,75 @@ def download(
         raise
 
 
+def download_json(
+    s3_bucket: str,
+    s3_path: str,
+) -> dict:
+    """Downloads a json file from s3.
+
+    Args:
+        s3_path (str): the s3 path to download
+
+    Returns:
+        dict: the parsed json
+    """
+    try:
+        client = __get_client()
+        obj = client.get_object(
+            Bucket=s3_bucket,
+            Key=s3_path,
+        )
+        return json.loads(obj["Body"].read().decode("utf-8"))
+    except json.JSONDecodeError as json_ex:
+        logger.error(f"File {s3_path=} does not contain valid json: {json_ex}")
+        raise ValueError(f"Not valid json '{s3_path}': {json_ex}") from json_ex
+    except Exception as ex:
+        logger.error(f"Failed to download {s3_path=} from s3: {ex}")
+        raise
+
+
+def etag(
+    s3_bucket: str,
+    s3_path: str,
+) -> str:
+    """The ETag of an object, which changes whenever it is written, without downloading it.
+
+    Args:
+        s3_path (str): the s3 path to check
+
+    Returns:
+        str: the ETag
+    """
+    try:
+        client = __get_client()
+        return client.head_object(Bucket=s3_bucket, Key=s3_path)["ETag"]
+    except Exception as ex:
+        logger.error(f"Failed to head {s3_path=} in s3: {ex}")
+        raise
+
+
+def upload_file(
+    s3_bucket: str,
+    s3_path: str,
+    file_path: str,
+) -> None:
+    """Uploads a local file to s3 as-is.
+
+    Args:
+        s3_path (str): the s3 path to write to
+        file_path (str): the local file, e.g. under /tmp
+
+    Returns:
+        None
+    """
+    try:
+        client = __get_client()
+        client.upload_file(file_path, s3_bucket, s3_path)
+    except Exception as ex:
+        logger.error(f"Failed to upload {file_path=} to {s3_path=}: {ex}")
+        raise
+
+
 def list(
     s3_bucket: str,
     prefix: str = None,
@@ -99,9 +176,10 @@ def list(
     """
     try:
         client = __get_client()
+        # boto3 rejects Prefix=None, so only send it when set
         objects = client.list_objects_v2(
             Bucket=s3_bucket,
-            Prefix=prefix,
+            **({"Prefix": prefix} if prefix else {}),
         )
         paths = [obj["Key"] for obj in objects.get("Contents", [])]
         if suffix:
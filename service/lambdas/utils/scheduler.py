@@ -0,0 +1,33 @@
+import pydantic
+from bisect import bisect_right
+from datetime import datetime
+from typing import List, Optional
+
+
+class PollPlan(pydantic.BaseModel):
+    """Poll plan written by `lineal_rugby.scheduler.build_poll_plan`"""
+
+    generated_at: datetime
+    valid_until: datetime
+    poll_times: List[datetime] = []
+
+
+def is_poll_due(
+    plan: Optional[PollPlan], window_start: datetime, window_end: datetime
+) -> bool:
+    """Whether a poll is planned in (window_start, window_end], i.e. since the previous trigger.
+
+    A missing or stale plan is always due, so we fall back to polling on every trigger.
+
+    Args:
+        plan (Optional[PollPlan]): the current poll plan, if any
+        window_start (datetime): time of the previous trigger
+        window_end (datetime): time of this trigger
+
+    Returns:
+        bool: True if the ETL should run
+    """
+    if plan is None or window_end >= plan.valid_until:
+        return True
+    idx = bisect_right(plan.poll_times, window_start)
+    return idx < len(plan.poll_times) and plan.poll_times[idx] <= window_end
@@ -1,13 +1,30 @@
-import boto3
-import botocore
 import json
+import os
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
+
+if TYPE_CHECKING:
+    import boto3
+
+# seconds a fetched secret is served from memory before it is re-read
+DEFAULT_TTL_SECONDS = int(os.environ.get("SECRET_CACHE_TTL_SECONDS", "3600"))
 
 __secretsmanager_client = None
 
+# secret_name -> (secret, fetched_at), lives for the life of the lambda container
+__secret_cache: Dict[str, Tuple[str, float]] = {}
 
-def __get_client() -> boto3.client:
+
+def __get_client() -> "boto3.client":
     global __secretsmanager_client
-    __secretsmanager_client = __secretsmanager_client or boto3.client(
+    if __secretsmanager_client is not None:
+        return __secretsmanager_client
+
+    # boto3 takes ~150ms to import, defer it until the first call that needs a client
+    import boto3
+    import botocore
+
+    __secretsmanager_client = boto3.client(
         "secretsmanager",
         config=botocore.client.Config(
             connect_timeout=2,
@@ -18,22 +35,78 @@ def __get_client() -> boto3.client:
     return __secretsmanager_client
 
 
-def __get_secret(secret_name: str) -> str:
+def __fetch_secret(secret_name: str) -> str:
     client = __get_client()
     get_secret_value_response = client.get_secret_value(SecretId=secret_name)
     secret = get_secret_value_response["SecretString"]
     return str(secret)
 
 
-def get_secret_string(secret_name: str) -> str:
-    secret = __get_secret(secret_name)
+def __get_secret(
+    secret_name: str,
+    ttl_seconds: Optional[int] = None,
+    force_refresh: bool = False,
+) -> str:
+    ttl_seconds = DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    cached = __secret_cache.get(secret_name)
+    if (
+        not force_refresh
+        and cached is not None
+        and time.monotonic() - cached[1] < ttl_seconds
+    ):
+        return cached[0]
+
+    secret = __fetch_secret(secret_name)
+    __secret_cache[secret_name] = (secret, time.monotonic())
+    return secret
+
+
+def get_secret_string(
+    secret_name: str,
+    ttl_seconds: Optional[int] = None,
+    force_refresh: bool = False,
+) -> str:
+    """Get a secret string, served from the in-process cache when fresh.
+
+    Args:
+        secret_name (str): name or arn of the secret
+        ttl_seconds (int, optional): max age of a cached value. Defaults to `SECRET_CACHE_TTL_SECONDS`, or 1 hour.
+        force_refresh (bool, optional): skip the cache and re-read from secrets manager. Defaults to False.
+
+    Returns:
+        str: the secret
+    """
+    secret = __get_secret(secret_name, ttl_seconds, force_refresh)
     return secret
 
 
-def get_secret_json(secret_name: str) -> dict:
-    secret = __get_secret(secret_name)
+def get_secret_json(
+    secret_name: str,
+    ttl_seconds: Optional[int] = None,
+    force_refresh: bool = False,
+) -> dict:
+    """Get a secret and parse it as json, see `get_secret_string` for caching behaviour."""
+    secret = __get_secret(secret_name, ttl_seconds, force_refresh)
     try:
         secret_json = json.loads(secret)
     except json.JSONDecodeError:
         raise ValueError(f"Secret '{secret_name}' is not valid json")
     return secret_json
+
+
+def prefetch(secret_names: Iterable[str]) -> None:
+    """Warm the cache at init time, so the first invocation pays no fetch latency either.
+
+    Args:
+        secret_names (Iterable[str]): names or arns of the secrets to load
+    """
+    for secret_name in secret_names:
+        __get_secret(secret_name, force_refresh=True)
+
+
+def invalidate(secret_name: Optional[str] = None) -> None:
+    """Drop a secret from the cache, or every secret if no name is given."""
+    if secret_name is None:
+        __secret_cache.clear()
+    else:
+        __secret_cache.pop(secret_name, None)
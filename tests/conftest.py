@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from lineal_rugby.models import LinealCupEvent
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def day(days: int) -> datetime:
+    return START + timedelta(days=days)
+
+
+def match_result(
+    start_time: datetime, winner: str, loser: str, **fields
+) -> LinealCupEvent:
+    """A men's World Series result, identified by its start time unless `fields` say otherwise"""
+    return LinealCupEvent(
+        **{
+            "start_time": start_time,
+            "winner_name": winner,
+            "loser_name": loser,
+            "is_tie": False,
+            "gender": "men",
+            "competition_name": "World Series",
+            "sport_event_id": f"sr:sport_event:{start_time:%Y%m%d%H}",
+            **fields,
+        }
+    )
+
+
+@pytest.fixture
+def tmp_cwd(tmp_path, monkeypatch):
+    """Outputs are written to relative paths, web assets to `../web/assets`, so run a level down"""
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    monkeypatch.chdir(run_dir)
+    return run_dir
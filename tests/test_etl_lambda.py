@@ -0,0 +1,86 @@
+import importlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import pytest
+
+TRIGGER_TIME = datetime(2024, 7, 1, tzinfo=timezone.utc)
+
+
+def _event(trigger_time: datetime):
+    from aws_lambda_powertools.utilities.data_classes import EventBridgeEvent
+
+    return EventBridgeEvent(
+        {
+            "version": "0",
+            "id": "test",
+            "detail-type": "Scheduled Event",
+            "source": "aws.events",
+            "account": "000000000000",
+            "time": trigger_time.isoformat().replace("+00:00", "Z"),
+            "region": "eu-west-2",
+            "resources": [],
+            "detail": {},
+        }
+    )
+
+
+@pytest.fixture
+def etl(monkeypatch):
+    """The handler module with a fresh cache, and the s3 calls it makes counted instead of sent"""
+    monkeypatch.setenv("POWERTOOLS_TRACE_DISABLED", "true")
+    monkeypatch.setenv("POWERTOOLS_METRICS_NAMESPACE", "test")
+    monkeypatch.delenv("SPORT_RADAR_API_KEY_SECRET_NAME", raising=False)
+    index = importlib.reload(
+        importlib.import_module("service.lambdas.lineal_world_title_etl.index")
+    )
+    calls = Counter()
+    plan = {
+        "generated_at": TRIGGER_TIME.isoformat(),
+        "valid_until": (TRIGGER_TIME + timedelta(days=14)).isoformat(),
+        "poll_times": [(TRIGGER_TIME + timedelta(days=7)).isoformat()],
+    }
+
+    def counted(name, result):
+        def call(*args, **kwargs):
+            calls[name] += 1
+            return result
+
+        return call
+
+    monkeypatch.setattr(index.s3, "etag", counted("etag", '"v1"'))
+    monkeypatch.setattr(index.s3, "download_json", counted("download_json", plan))
+    monkeypatch.setattr(index.s3, "list", counted("list", []))
+    index.calls = calls
+    return index
+
+
+def test_skipped_trigger_makes_no_s3_calls(etl):
+    # the cold start fetches the plan
+    assert etl._handle(_event(TRIGGER_TIME))["body"] == "no fixture due"
+    assert etl.calls == Counter(etag=1, download_json=1)
+
+    etl.calls.clear()
+    for hours in range(1, 6):
+        response = etl._handle(_event(TRIGGER_TIME + timedelta(hours=hours)))
+        assert response["body"] == "no fixture due"
+    assert etl.calls == Counter()
+
+
+def test_due_poll_revalidates_the_plan(etl):
+    etl._handle(_event(TRIGGER_TIME))
+    etl.calls.clear()
+
+    etl._handle(_event(TRIGGER_TIME + timedelta(days=7)))
+
+    # unchanged, so only the head request, then the poll itself
+    assert etl.calls == Counter(etag=1, list=1)
+
+
+def test_plan_is_fetched_again_once_its_horizon_passed(etl):
+    etl._handle(_event(TRIGGER_TIME))
+    etl.calls.clear()
+
+    etl._handle(_event(TRIGGER_TIME + timedelta(days=15)))
+
+    # still stale after the fetch, so the poll is due, without checking the plan twice
+    assert etl.calls == Counter(etag=1, list=1)
@@ -0,0 +1,152 @@
+import os
+from datetime import timedelta
+import pytest
+from lineal_rugby import eventlog
+from lineal_rugby.models import LinealCup, LinealCupEvent
+from .conftest import START, match_result
+
+
+def _event(idx: int, **fields) -> LinealCupEvent:
+    """One result an hour, 21-7 wins rotating between three teams"""
+    return match_result(
+        START + timedelta(hours=idx),
+        f"Team {idx % 3}",
+        f"Team {idx % 3 + 1}",
+        **{
+            "sport_event_id": f"sr:sport_event:{1000 + idx}",
+            "winner_score": 21,
+            "loser_score": 7,
+            **fields,
+        },
+    )
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    return str(tmp_path / "eventlog" / "men")
+
+
+def test_round_trip(log_dir):
+    events = [
+        _event(0),
+        _event(1, is_tie=True, winner_score=14, loser_score=14),
+        _event(2, sport_event_id=None, winner_score=None, loser_score=None),
+        _event(3, sport_event_id="history:1999-fiji-samoa"),
+    ]
+    assert eventlog.append(log_dir, events) == 4
+
+    with eventlog.EventLog(log_dir) as log:
+        assert len(log) == 4
+        assert list(log.events("men")) == events
+
+
+def test_append_after_existing_records(log_dir):
+    eventlog.append(log_dir, [_event(0), _event(1)])
+    with eventlog.EventLog(log_dir) as log:
+        generation = log.generation
+
+    eventlog.append(log_dir, [_event(2, winner_name="New Team")])
+
+    with eventlog.EventLog(log_dir) as log:
+        assert log.generation == generation
+        assert [e.winner_name for e in log.events("men")] == [
+            "Team 0",
+            "Team 1",
+            "New Team",
+        ]
+
+
+def test_append_rejects_out_of_order_events(log_dir):
+    eventlog.append(log_dir, [_event(5)])
+
+    with pytest.raises(ValueError):
+        eventlog.append(log_dir, [_event(4)])
+    with pytest.raises(ValueError):
+        eventlog.append(log_dir, [_event(7), _event(6)])
+
+    with eventlog.EventLog(log_dir) as log:
+        assert len(log) == 1
+
+
+def test_reader_picks_up_appends_on_refresh(log_dir):
+    eventlog.append(log_dir, [_event(0)])
+    with eventlog.EventLog(log_dir) as log:
+        eventlog.append(log_dir, [_event(1, winner_name="New Team")])
+        assert len(log) == 1
+        log.refresh()
+        assert len(log) == 2
+        assert log.name(log.record(1).winner_id) == "New Team"
+
+
+def test_torn_tail_is_ignored_and_dropped_by_the_next_append(log_dir):
+    eventlog.append(log_dir, [_event(0), _event(1)])
+    # an append interrupted part way through a record, and a string
+    with open(os.path.join(log_dir, eventlog.EVENTS_FILENAME), "ab") as file:
+        file.write(b"\x01" * (eventlog.RECORD.size // 2))
+    with open(os.path.join(log_dir, eventlog.STRINGS_FILENAME), "ab") as file:
+        file.write(eventlog.STRING_LENGTH.pack(20) + b"Torn")
+
+    with eventlog.EventLog(log_dir) as log:
+        assert len(log) == 2
+        assert list(log.events("men")) == [_event(0), _event(1)]
+
+    eventlog.append(log_dir, [_event(2, winner_name="New Team")])
+
+    with eventlog.EventLog(log_dir) as log:
+        assert list(log.events("men")) == [
+            _event(0),
+            _event(1),
+            _event(2, winner_name="New Team"),
+        ]
+
+
+def test_find(log_dir):
+    eventlog.append(
+        log_dir,
+        [_event(0), _event(1, sport_event_id="history:1"), _event(2)],
+    )
+
+    with eventlog.EventLog(log_dir) as log:
+        assert log.find("sr:sport_event:1000") == 0
+        assert log.find("history:1") == 1
+        assert log.find("sr:sport_event:1002") == 2
+        assert log.find("sr:sport_event:1001") is None
+        assert log.find("history:2") is None
+
+
+def test_time_at_and_bisect_across_index_blocks(log_dir):
+    count = eventlog.INDEX_STRIDE * 2 + 10
+    events = [_event(idx) for idx in range(count)]
+    eventlog.append(log_dir, events[:100])
+    # the appended records extend the index
+    eventlog.append(log_dir, events[100:])
+
+    with eventlog.EventLog(log_dir) as log:
+        for idx in (0, 1, eventlog.INDEX_STRIDE, count - 1):
+            assert log.time_at(idx) == eventlog.to_us(events[idx].start_time)
+        for idx in (0, eventlog.INDEX_STRIDE - 1, eventlog.INDEX_STRIDE, count - 1):
+            assert log.bisect(events[idx].start_time) == idx
+            assert log.bisect(events[idx].start_time - timedelta(minutes=1)) == idx
+        assert log.bisect(events[-1].start_time + timedelta(minutes=1)) == count
+
+        window = list(log.events("men", events[300].start_time, events[305].start_time))
+        assert window == events[300:305]
+
+
+def test_sync_appends_a_prefix_and_rewrites_a_correction(tmp_cwd):
+    events = [_event(idx) for idx in range(3)]
+    cup = LinealCup(competition_name="World Series", gender="men", events=events[:2])
+    assert eventlog.sync(cup) == 2
+    with eventlog.EventLog(eventlog.log_dir("men")) as log:
+        generation = log.generation
+
+    cup.events = events
+    assert eventlog.sync(cup) == 1
+    with eventlog.EventLog(eventlog.log_dir("men")) as log:
+        assert log.generation == generation
+
+    cup.events = [events[0], _event(1, winner_score=28), events[2]]
+    assert eventlog.sync(cup) == 3
+    with eventlog.EventLog(eventlog.log_dir("men")) as log:
+        assert log.generation != generation
+        assert list(log.events("men")) == cup.events
@@ -0,0 +1,127 @@
+import json
+import os
+from datetime import datetime, timezone
+import pytest
+from lineal_rugby import app, eventlog, holders, ingest
+from lineal_rugby.models import LinealCup, Summary
+from .conftest import match_result
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# the fixture is Kenya beating Samoa 10-5 on 2024-07-27
+SPORT_EVENT_ID = "sr:sport_event:51556109"
+
+
+def _summary(**status) -> Summary:
+    with open(os.path.join(FIXTURES_DIR, "sport_event_summary.json"), "r") as file:
+        content = json.load(file)
+    content["sport_event_status"].update(status)
+    return Summary(**content)
+
+
+@pytest.fixture
+def published(tmp_cwd):
+    """A men's cup published by a full run, held by Samoa before the fixture's match"""
+    cup = LinealCup(
+        competition_name="Olympic Tournament",
+        gender="men",
+        events=[
+            match_result(
+                datetime(2024, 6, 1, tzinfo=timezone.utc),
+                "Samoa",
+                "Fiji",
+                sport_event_id="sr:sport_event:1",
+                winner_score=19,
+                loser_score=12,
+            )
+        ],
+    )
+    for field, value in app.augment_cup(cup).items():
+        setattr(cup, field, value)
+    app.publish_cup(cup)
+    return cup
+
+
+def _logged_events():
+    with eventlog.EventLog(eventlog.log_dir("men")) as log:
+        return list(log.events("men"))
+
+
+def test_to_event_rejects_matches_that_do_not_count():
+    with pytest.raises(ValueError):
+        ingest.to_event(_summary(match_status="postponed"))
+
+
+def test_append_a_title_match(published):
+    result = ingest.ingest(_summary())
+
+    assert result.status == "appended"
+    assert result.holder == "Kenya"
+    assert result.title_match.winner_name == "Kenya"
+    assert (result.title_match.winner_score, result.title_match.loser_score) == (
+        10,
+        5,
+    )
+    assert [e.sport_event_id for e in _logged_events()] == [
+        "sr:sport_event:1",
+        SPORT_EVENT_ID,
+    ]
+
+    state = holders.load_state("men")
+    assert [(r.holder, r.matches) for r in state.reigns] == [
+        ("Samoa", 1),
+        ("Kenya", 1),
+    ]
+    with open(holders.holders_path("men"), "r") as file:
+        assert len(file.readlines()) == 2
+    with open(os.path.join("..", "web", "assets", "men_lineal_cup_stats.json")) as file:
+        assert json.load(file)["currentHolder"] == "Kenya"
+    assert os.path.exists(os.path.join("web_static", "men.html"))
+
+
+def test_duplicate_is_ignored(published):
+    ingest.ingest(_summary())
+    with open(holders.state_path("men"), "rb") as file:
+        state = file.read()
+
+    result = ingest.ingest(_summary())
+
+    assert result.status == "duplicate"
+    assert result.holder == "Kenya"
+    assert len(_logged_events()) == 2
+    with open(holders.state_path("men"), "rb") as file:
+        assert file.read() == state
+
+
+def test_correction_rebuilds_the_cup(published):
+    ingest.ingest(_summary())
+
+    # the result is corrected upstream, Samoa won and keep the title
+    result = ingest.ingest(
+        _summary(home_score=12, away_score=10, winner_id="sr:competitor:165818")
+    )
+
+    assert result.status == "rebuilt"
+    assert result.holder == "Samoa"
+    assert result.title_match.winner_name == "Samoa"
+    events = _logged_events()
+    assert len(events) == 2
+    assert (events[-1].winner_name, events[-1].winner_score) == ("Samoa", 12)
+    state = holders.load_state("men")
+    assert [(r.holder, r.matches) for r in state.reigns] == [("Samoa", 2)]
+
+
+def test_late_result_rebuilds_the_cup(published):
+    ingest.ingest(_summary())
+
+    summary = _summary()
+    summary.sport_event.id = "sr:sport_event:2"
+    summary.sport_event.start_time = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    result = ingest.ingest(summary)
+
+    assert result.status == "rebuilt"
+    assert [e.sport_event_id for e in _logged_events()] == [
+        "sr:sport_event:2",
+        "sr:sport_event:1",
+        SPORT_EVENT_ID,
+    ]
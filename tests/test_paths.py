@@ -0,0 +1,79 @@
+from datetime import timedelta
+from lineal_rugby import eventlog
+from lineal_rugby.paths import ResultsGraph
+from .conftest import day, match_result
+
+# Samoa then Fiji hold the cup. Tonga can be reached through Kenya in 3 wins, or Samoa in 2.
+# Spain beat Kenya before Kenya had a chain from the holder, so Spain has none.
+EVENTS = [
+    match_result(day(1), "Samoa", "Fiji"),
+    match_result(day(2), "Fiji", "Samoa"),
+    match_result(day(3), "Spain", "Kenya"),
+    match_result(day(4), "Kenya", "Samoa"),
+    match_result(day(5), "Tonga", "Kenya"),
+    match_result(day(6), "Tonga", "Samoa"),
+    match_result(day(7), "USA", "Canada", is_tie=True),
+]
+NOW = day(10)
+
+
+def _chain(path):
+    return [(win.winner_name, win.loser_name) for win in path.wins]
+
+
+def test_shortest_chain():
+    path = ResultsGraph.from_events(EVENTS).path("Tonga", NOW)
+
+    assert path.holder == "Fiji"
+    assert _chain(path) == [("Samoa", "Fiji"), ("Tonga", "Samoa")]
+
+
+def test_chain_follows_results_in_time_order():
+    path = ResultsGraph.from_events(EVENTS).path("Kenya", NOW)
+
+    assert _chain(path) == [("Samoa", "Fiji"), ("Kenya", "Samoa")]
+    assert [win.start_time for win in path.wins] == [day(1), day(4)]
+
+
+def test_unreachable_teams():
+    graph = ResultsGraph.from_events(EVENTS)
+
+    # won before the team it beat was reached
+    assert graph.path("Spain", NOW) is None
+    # only a tie, which passes nothing on
+    assert graph.path("USA", NOW) is None
+    assert graph.path("Unknown", NOW) is None
+
+
+def test_paths_of_every_team():
+    paths = ResultsGraph.from_events(EVENTS).paths(NOW)
+
+    assert {team: len(path.wins) for team, path in paths.items()} == {
+        "Fiji": 0,
+        "Samoa": 1,
+        "Kenya": 2,
+        "Tonga": 2,
+    }
+
+
+def test_paths_at_an_earlier_time():
+    graph = ResultsGraph.from_events(EVENTS)
+
+    # later results are left out, Tonga's first win is on day 5
+    path = graph.path("Kenya", day(4) + timedelta(hours=1))
+    assert _chain(path) == [("Samoa", "Fiji"), ("Kenya", "Samoa")]
+    assert graph.path("Tonga", day(4) + timedelta(hours=1)) is None
+    # Samoa held the cup and no one had beaten them yet
+    assert graph.paths(day(1) + timedelta(hours=1)).keys() == {"Samoa"}
+    # before the first result there is no holder
+    assert graph.paths(day(0)) == {}
+
+
+def test_from_log_matches_from_events(tmp_path):
+    directory = str(tmp_path / "men")
+    eventlog.append(directory, EVENTS)
+
+    with eventlog.EventLog(directory) as log:
+        from_log = ResultsGraph.from_log(log, "men").paths(NOW)
+
+    assert from_log == ResultsGraph.from_events(EVENTS).paths(NOW)
@@ -0,0 +1,146 @@
+import json
+import urllib.error
+import urllib.request
+from datetime import timedelta
+import pytest
+from lineal_rugby import eventlog
+from lineal_rugby.models import LinealCup
+from lineal_rugby.service import QueryError, QueryService
+from .conftest import day, match_result
+
+# Samoa hold the title for 2 matches, then Fiji for 2, then Kenya. Day 3 is not a title match.
+EVENTS = [
+    match_result(day(1), "Samoa", "Fiji"),
+    match_result(day(2), "Samoa", "Fiji", is_tie=True),
+    match_result(day(3), "Kenya", "Fiji"),
+    match_result(day(4), "Fiji", "Samoa"),
+    match_result(day(5), "Fiji", "Kenya"),
+    match_result(day(6), "Kenya", "Fiji"),
+]
+
+
+@pytest.fixture
+def service(tmp_cwd):
+    eventlog.append(eventlog.log_dir("men"), EVENTS)
+    service = QueryService(genders=("men",))
+    assert service.reload() == ["men"]
+    return service
+
+
+def _wins(leaderboard):
+    return [(w.country, w.wins) for w in leaderboard.winsByCountry]
+
+
+def test_holder_at(service):
+    index = service.index("men")
+
+    assert index.holder_at(day(0)).holder is None
+    holder = index.holder_at(day(2) + timedelta(hours=1))
+    assert (holder.holder, holder.since) == ("Samoa", day(1))
+    # a title match changes the holder from its start time
+    assert index.holder_at(day(4)).holder == "Fiji"
+    holder = index.holder_at(day(10))
+    assert (holder.holder, holder.since) == ("Kenya", day(6))
+
+
+def test_team_history(service):
+    history = service.index("men").team_history("Fiji", limit=2)
+
+    assert [(r.holder, r.start_time, r.matches) for r in history.reigns] == [
+        ("Fiji", day(4), 2)
+    ]
+    assert [m.start_time for m in history.title_matches] == [day(5), day(6)]
+
+
+def test_head_to_head(service):
+    index = service.index("men")
+
+    h2h = index.head_to_head("Fiji", "Samoa")
+    assert (h2h.wins, h2h.ties) == ([1, 1], 1)
+    assert [r.start_time for r in h2h.results] == [day(1), day(2), day(4)]
+
+    # wins are in the order the teams are asked for, the results are the most recent
+    h2h = index.head_to_head("Kenya", "Fiji", limit=2)
+    assert (h2h.teams, h2h.wins, h2h.ties) == (["Kenya", "Fiji"], [2, 1], 0)
+    assert [r.start_time for r in h2h.results] == [day(5), day(6)]
+
+
+def test_leaderboard_window(service):
+    index = service.index("men")
+
+    assert _wins(index.leaderboard()) == [("Fiji", 2), ("Samoa", 2), ("Kenya", 1)]
+    # title matches in [day 2, day 5)
+    assert _wins(index.leaderboard(day(2), day(5))) == [("Fiji", 1), ("Samoa", 1)]
+    assert _wins(index.leaderboard(day(5))) == [("Fiji", 1), ("Kenya", 1)]
+    assert _wins(index.leaderboard(limit=1)) == [("Fiji", 2)]
+
+
+def test_routing(service):
+    holder = service.query("/men/holder", {"at": ["2024-01-05T12:00:00"]})
+    assert holder.holder == "Fiji"
+    assert service.query("/men/stats", {}).currentHolder == "Kenya"
+    assert service.query("/men/teams/Samoa", {}).team == "Samoa"
+    h2h = service.query("/men/head-to-head/Samoa/Fiji", {"limit": ["1"]})
+    assert (h2h.wins, len(h2h.results)) == ([1, 1], 1)
+    leaderboard = service.query(
+        "/men/leaderboard", {"from": ["2024-01-06"], "limit": ["5"]}
+    )
+    assert _wins(leaderboard) == [("Fiji", 1), ("Kenya", 1)]
+
+
+@pytest.mark.parametrize(
+    "path, query, status",
+    [
+        ("/women/holder", {}, 404),
+        ("/men/teams/Tonga", {}, 404),
+        ("/men/unknown", {}, 404),
+        ("/men/holder", {"at": ["yesterday"]}, 400),
+        ("/men/leaderboard", {"limit": ["-1"]}, 400),
+    ],
+)
+def test_bad_requests(service, path, query, status):
+    with pytest.raises(QueryError) as error:
+        service.query(path, query)
+    assert error.value.status == status
+
+
+def test_http(service):
+    with service.start() as running:
+        with urllib.request.urlopen(f"{running.base_url}/men/holder") as response:
+            assert json.load(response)["holder"] == "Kenya"
+        with urllib.request.urlopen(f"{running.base_url}/health") as response:
+            assert json.load(response)["men"]["events"] == len(EVENTS)
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{running.base_url}/men/teams/Tonga")
+        assert error.value.code == 404
+
+
+def test_reload_on_append(service):
+    previous = service.index("men")
+    assert service.reload() == []
+
+    eventlog.append(eventlog.log_dir("men"), [match_result(day(7), "Samoa", "Kenya")])
+
+    assert service.reload() == ["men"]
+    index = service.index("men")
+    assert index.events == len(EVENTS) + 1
+    assert index.generation == previous.generation
+    assert index.holder_at(day(10)).holder == "Samoa"
+    # a request that started on the old index finishes on it
+    assert previous.holder_at(day(10)).holder == "Kenya"
+
+
+def test_reload_on_rewrite(service):
+    previous = service.index("men")
+
+    # day 6 is corrected to a Fiji win, so Fiji never lost the title
+    events = EVENTS[:-1] + [match_result(day(6), "Fiji", "Kenya")]
+    eventlog.sync(
+        LinealCup(competition_name="World Series", gender="men", events=events)
+    )
+
+    assert service.reload() == ["men"]
+    index = service.index("men")
+    assert index.generation != previous.generation
+    assert index.holder_at(day(10)).holder == "Fiji"
+    assert _wins(index.leaderboard()) == [("Fiji", 3), ("Samoa", 2)]
@@ -0,0 +1,78 @@
+import json
+import os
+from datetime import datetime, timezone
+from lineal_rugby import app, shards
+from lineal_rugby.models import LinealCup, LinealCupEvent
+from .conftest import match_result
+
+
+def _result(year: int, winner: str, loser: str) -> LinealCupEvent:
+    return match_result(datetime(year, 1, 1, tzinfo=timezone.utc), winner, loser)
+
+
+def _cup(events) -> LinealCup:
+    cup = LinealCup(competition_name="World Series", gender="men", events=events)
+    for field, value in app.augment_cup(cup).items():
+        setattr(cup, field, value)
+    return cup
+
+
+def _index(kind: str) -> dict:
+    with open(shards._shard_path("men", kind, "index.json"), "r") as file:
+        return {ref["key"]: ref["file"] for ref in json.load(file)["shards"]}
+
+
+def _files(kind: str) -> set:
+    return set(os.listdir(os.path.dirname(shards._shard_path("men", kind, "x"))))
+
+
+def test_colliding_slugs_get_their_own_shards(tmp_cwd):
+    shards.write_shards(
+        _cup(
+            [
+                _result(2020, "Hong Kong", "Fiji"),
+                _result(2021, "Hong-Kong", "Hong Kong"),
+            ]
+        )
+    )
+
+    files = _index("teams")
+    assert files["Hong Kong"] == "hong-kong.json"
+    assert files["Hong-Kong"].startswith("hong-kong-")
+    for team, filename in files.items():
+        with open(shards._shard_path("men", "teams", filename), "r") as file:
+            assert json.load(file)["team"] == team
+
+
+def test_a_new_team_never_takes_over_a_shard(tmp_cwd):
+    events = [_result(2020, "Hong-Kong", "Fiji"), _result(2021, "Fiji", "Hong-Kong")]
+    shards.write_shards(_cup(events))
+
+    cup = _cup(events + [_result(2022, "Hong Kong", "Fiji")])
+    shards.add_title_match("men", cup.title_matches[-1], cup.reigns)
+
+    files = _index("teams")
+    assert files["Hong-Kong"] == "hong-kong.json"
+    assert files["Hong Kong"].startswith("hong-kong-")
+    # a full run agrees with the incremental one
+    shards.write_shards(cup)
+    assert _index("teams") == files
+
+
+def test_stale_shards_are_removed(tmp_cwd):
+    shards.write_shards(
+        _cup([_result(2020, "Samoa", "Fiji"), _result(2021, "Kenya", "Samoa")])
+    )
+    assert "kenya.json" in _files("teams")
+    assert "2021.json" in _files("timeline")
+
+    # the 2021 result is removed upstream
+    shards.write_shards(_cup([_result(2020, "Samoa", "Fiji")]))
+
+    assert {f for f in _files("teams") if f.endswith(".json")} == {
+        "index.json",
+        "fiji.json",
+        "samoa.json",
+    }
+    assert not any(f.startswith("kenya") for f in _files("teams"))
+    assert not any(f.startswith("2021") for f in _files("timeline"))